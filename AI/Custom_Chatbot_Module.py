@@ -1,14 +1,41 @@
+import json
 import nltk
-nltk.download('punkt')
-nltk.download('wordnet')
-nltk.download('omw-1.4')
-
+import os
 import random
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
 from nltk.stem import WordNetLemmatizer
 from nltk.tokenize import word_tokenize
 
 lemmatizer = WordNetLemmatizer()
 
+NLTK_RESOURCES = {
+    "tokenizers/punkt": "punkt",
+    "tokenizers/punkt_tab": "punkt_tab",
+    "corpora/wordnet": "wordnet",
+    "corpora/omw-1.4": "omw-1.4",
+}
+
+def ensure_nltk_data():
+    """
+    Downloads only the NLTK resources that are not installed yet. Called on
+    first use rather than at import so that importing the module is cheap.
+    """
+    for path, name in NLTK_RESOURCES.items():
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            nltk.download(name, quiet=True)
+
+@lru_cache(maxsize=65536)
+def lemmatize(token):
+    return lemmatizer.lemmatize(token)
+
+def lemmas(text):
+    return [lemmatize(token) for token in word_tokenize(text.lower())]
+
 knowledge_base = {
     "greetings": {
         "patterns": ["hello", "hi", "hey", "I want to talk", "what's up", "good morning", "good evening"],
@@ -140,52 +167,186 @@ knowledge_base = {
 
 conversation_state = {"last_intent": None, "awaiting_followup": False}
 
-def get_response(user_message, knowledge_base, threshold=1):
-    global conversation_state
+CRISIS_RESPONSE = ("It sounds like you're going through a lot right now. "
+                   "Please connect with a professional who can help. "
+                   "You can call the 24/7 Suicide Prevention and Mental Health Helpline.")
+
+compiled_bases = {}
+
+def compile_knowledge_base(knowledge_base):
+    """
+    Builds a lemma -> [(intent, weight)] inverted index, where weight is how
+    many times the lemma occurs across the intent's patterns. Call again
+    after editing a knowledge base in place.
+    """
+    ensure_nltk_data()
+    order = {intent: i for i, intent in enumerate(knowledge_base)}
+    weights = defaultdict(lambda: defaultdict(int))
+    for intent, data in knowledge_base.items():
+        for pattern in data["patterns"]:
+            for lemma in lemmas(pattern):
+                weights[lemma][intent] += 1
+
+    index = {lemma: list(per_intent.items()) for lemma, per_intent in weights.items()}
+    compiled_bases[id(knowledge_base)] = (knowledge_base, index, order)
+    return index, order
+
+def match_intent(user_message, knowledge_base):
+    """
+    Returns (best_intent, best_score) for a message, where the score is
+    the number of pattern tokens found in the message. Ties go to the
+    intent listed first in the knowledge base.
+    """
+    compiled = compiled_bases.get(id(knowledge_base))
+    if compiled is None or compiled[0] is not knowledge_base:
+        index, order = compile_knowledge_base(knowledge_base)
+    else:
+        _, index, order = compiled
+
+    scores = defaultdict(int)
+    for lemma in set(lemmas(user_message)):
+        for intent, weight in index.get(lemma, ()):
+            scores[intent] += weight
+
+    if not scores:
+        return None, 0
+    best_intent = min(scores, key=lambda intent: (-scores[intent], order[intent]))
+    return best_intent, scores[best_intent]
+
+def new_state():
+    return {"last_intent": None, "awaiting_followup": False}
+
+def respond(user_message, knowledge_base, state, threshold=1, allowed_intents=None):
+    """
+    Returns (intent, reply) and updates `state` in place. A pending
+    followup is acknowledged only when the message matches no intent of
+    its own. When allowed_intents is given, messages matching any other
+    intent return (None, None) and only clear a pending followup.
+    """
     user_message = user_message.lower()
-    tokens = word_tokenize(user_message)
-    lemmatized_tokens = [lemmatizer.lemmatize(token) for token in tokens]
 
-    if conversation_state["awaiting_followup"]:
-        conversation_state["awaiting_followup"] = False
-        return f"Thank you for sharing: {user_message}. That means a lot."
+    best_intent, best_score = match_intent(user_message, knowledge_base)
+    if best_score < threshold:
+        best_intent = None
 
-    best_intent = None
-    best_score = 0
+    awaiting_followup = state["awaiting_followup"]
+    state["awaiting_followup"] = False
+    if awaiting_followup and best_intent is None:
+        return "followup", f"Thank you for sharing: {user_message}. That means a lot."
 
- 
-    for intent, data in knowledge_base.items():
-        patterns = data["patterns"]
-        score = 0
-        for pattern in patterns:
-            pattern = pattern.lower()
-            pattern_tokens = [lemmatizer.lemmatize(word) for word in word_tokenize(pattern)]
-            match_count = sum(1 for word in pattern_tokens if word in lemmatized_tokens)
-            score += match_count
-        if score > best_score:
-            best_score = score
-            best_intent = intent
-
-    if best_intent and best_score >= threshold:
+    if allowed_intents is not None and best_intent not in allowed_intents:
+        return None, None
+
+    if best_intent:
         responses = knowledge_base[best_intent]["responses"]
         if responses:
             response = random.choice(responses)
 
             if best_intent in ["grief", "gratitude", "joy"]:
-                conversation_state["awaiting_followup"] = True
+                state["awaiting_followup"] = True
 
-            conversation_state["last_intent"] = best_intent
-            return response
+            state["last_intent"] = best_intent
+            return best_intent, response
 
         elif best_intent == "crisis":
-            return ("It sounds like you're going through a lot right now. "
-                    "Please connect with a professional who can help. "
-                    "You can call the 24/7 Suicide Prevention and Mental Health Helpline.")
+            return best_intent, CRISIS_RESPONSE
+
+    return "default", random.choice(knowledge_base["default"]["responses"])
+
+def get_response(user_message, knowledge_base, threshold=1):
+    return respond(user_message, knowledge_base, conversation_state, threshold)[1]
+
+
+SESSION_TTL = int(os.getenv("CHATBOT_SESSION_TTL_SECONDS", "1800"))
+SESSION_MAX = int(os.getenv("CHATBOT_SESSION_MAX", "100000"))
+
+class MemorySessionStore:
+    """
+    Conversation state per session id, held in this process. Idle sessions
+    expire after `ttl` seconds and the least recently used are evicted
+    beyond `max_sessions`.
+    """
+
+    def __init__(self, ttl=SESSION_TTL, max_sessions=SESSION_MAX):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def load(self, session_id):
+        with self.lock:
+            entry = self.sessions.get(session_id)
+            if entry is None or entry[0] < time.monotonic():
+                self.sessions.pop(session_id, None)
+                return new_state()
+            return dict(entry[1])
+
+    def save(self, session_id, state):
+        with self.lock:
+            self.sessions[session_id] = (time.monotonic() + self.ttl, dict(state))
+            self.sessions.move_to_end(session_id)
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+
+    def __len__(self):
+        return len(self.sessions)
+
+class RedisSessionStore:
+    """
+    Same interface backed by a Redis-compatible server, so that any worker
+    can continue a conversation. Expiry is handled by the server.
+    """
+
+    def __init__(self, url, ttl=SESSION_TTL):
+        import redis
+        self.redis = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def load(self, session_id):
+        raw = self.redis.get(f"chatbot_state:{session_id}")
+        return json.loads(raw) if raw else new_state()
+
+    def save(self, session_id, state):
+        self.redis.set(f"chatbot_state:{session_id}", json.dumps(state), ex=self.ttl)
+
+def create_session_store(url=None):
+    url = url or os.getenv("CHATBOT_SESSION_URL")
+    if url and url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSessionStore(url)
+    return MemorySessionStore()
+
+SESSION_LOCKS = [threading.Lock() for _ in range(256)]
+
+class ChatSession:
+    """
+    Thread-safe handle on one user's conversation. Messages for the same
+    session are serialized through a striped lock so the followup flag
+    can never be read and written by two requests at once; a session
+    without an id keeps its state only for the lifetime of the handle.
+    """
+
+    def __init__(self, session_id=None, store=None, knowledge_base=None):
+        self.session_id = session_id
+        self.store = store
+        self.knowledge_base = knowledge_base
+        self.state = new_state()
+
+    def respond(self, user_message, threshold=1, allowed_intents=None):
+        kb = self.knowledge_base if self.knowledge_base is not None else knowledge_base
+        if not self.session_id or self.store is None:
+            return respond(user_message, kb, self.state, threshold, allowed_intents)
 
-    return random.choice(knowledge_base["default"]["responses"])
+        with SESSION_LOCKS[hash(self.session_id) % len(SESSION_LOCKS)]:
+            state = self.store.load(self.session_id)
+            awaiting_followup = state["awaiting_followup"]
+            intent, reply = respond(user_message, kb, state, threshold, allowed_intents)
+            if intent is not None or state["awaiting_followup"] != awaiting_followup:
+                self.store.save(self.session_id, state)
+            return intent, reply
 
 
 if __name__ == "__main__":
+    compile_knowledge_base(knowledge_base)
     print("Bot: Hi, I'm here to listen. You can type 'quit' to exit.")
     while True:
         user_input = input("You: ")
@@ -1,11 +1,45 @@
-
-from transformers import pipeline
 import os
-zero_shot = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+import re
+from collections import Counter
+from model_registry import registry
+import intent_embeddings
+from inference_cache import InferenceCache
+
+NLI_MODEL = os.environ.get("NLI_MODEL", "facebook/bart-large-mnli")
+EMOTION_MODEL = os.environ.get("EMOTION_MODEL", "j-hartmann/emotion-english-distilroberta-base")
+# Small NLI model screening messages before the heavy one; empty disables it.
+SAFETY_FAST_MODEL = os.environ.get("SAFETY_FAST_MODEL", "cross-encoder/nli-MiniLM2-L6-H768")
+# "torch" or "onnx" (ONNX Runtime, int8 unless ONNX_QUANTIZE=0) for the classifiers below.
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "torch")
+# "zero_shot" (NLI pass per label) or "embedding" (cached label centroids).
+INTENT_MODE = os.environ.get("INTENT_MODE", "zero_shot")
+
+# Intent and safety share one NLI pipeline through the registry.
+MODELS = {
+    "zero_shot": ("zero-shot-classification", NLI_MODEL, INFERENCE_BACKEND),
+    "emotion_clf": ("text-classification", EMOTION_MODEL, INFERENCE_BACKEND),
+    "safety_zero_shot": ("zero-shot-classification", NLI_MODEL, INFERENCE_BACKEND),
+}
+if SAFETY_FAST_MODEL:
+    MODELS["safety_fast"] = ("zero-shot-classification", SAFETY_FAST_MODEL, INFERENCE_BACKEND)
+
+def get_model(name):
+    return registry.get(*MODELS[name])
 
-emotion_clf = pipeline("text-classification", model="j-hartmann/emotion-english-distilroberta-base")
+def warm_up(names=None):
+    """
+    Loads the named models (all by default) ahead of the first request.
+    """
+    registry.warm_up(MODELS[n] for n in (names or MODELS))
+    if INTENT_MODE == "embedding":
+        intent_embeddings.get_centroids(INTENT_CANDIDATES)
+    return registry.report()
 
-safety_zero_shot = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+def __getattr__(name):
+    # Keeps `Intent_Detection.zero_shot` and friends working, loaded lazily.
+    if name in MODELS:
+        return get_model(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 INTENT_CANDIDATES = [
@@ -19,34 +53,125 @@ SAFETY_KEYWORDS = [
     "cut myself", "hang myself", "overdose", "cant go on"
 ]
 
-def detect_intent(text, candidates=INTENT_CANDIDATES):
+BATCH_SIZE = int(os.environ.get("INFERENCE_BATCH_SIZE", "16"))
+SAFETY_LABELS = ["self-harm or suicidal", "not suicidal"]
+# The fast model settles scores outside [LOW, HIGH]; the rest escalate.
+SAFETY_FAST_LOW = float(os.environ.get("SAFETY_FAST_LOW", "0.2"))
+SAFETY_FAST_HIGH = float(os.environ.get("SAFETY_FAST_HIGH", "0.9"))
+SAFETY_HEAVY_THRESHOLD = 0.7
+
+safety_stages = Counter()
+result_cache = InferenceCache()
+
+def as_list(out):
+    # Pipelines unwrap single-item batches in some transformers versions.
+    return [out] if isinstance(out, dict) else out
+
+def cached(task, version, fn, texts):
+    # Anything that trips a safety keyword is always classified afresh.
+    return result_cache.batch(task, version, fn, list(texts), bypass=lambda t: simple_keyword_safety(t)[0])
+
+def run_intent_batch(texts, candidates, mode):
+    if mode == "embedding":
+        return intent_embeddings.classify_batch(texts, candidates)
+    outs = as_list(get_model("zero_shot")(list(texts), candidate_labels=candidates, multi_label=False, batch_size=BATCH_SIZE))
+    return [{"label": out["labels"][0], "score": out["scores"][0], "all": list(zip(out["labels"], out["scores"]))} for out in outs]
+
+def detect_intent_batch(texts, candidates=INTENT_CANDIDATES, mode=None):
+    """
+    Batched detect_intent: one forward pass over all uncached texts.
+    """
+    mode = mode or INTENT_MODE
+    model = intent_embeddings.INTENT_EMBEDDING_MODEL if mode == "embedding" else f"{INFERENCE_BACKEND}:{NLI_MODEL}"
+    version = f"{mode}:{model}:{','.join(candidates)}"
+    return cached("intent", version, lambda batch: run_intent_batch(batch, candidates, mode), texts)
+
+def detect_intent(text, candidates=INTENT_CANDIDATES, mode=None):
     """
     Returns: {label: str, score: float, all_scores: list}
     """
-    out = zero_shot(text, candidate_labels=candidates, multi_label=False)
-    return {"label": out["labels"][0], "score": out["scores"][0], "all": list(zip(out["labels"], out["scores"]))}
+    return detect_intent_batch([text], candidates, mode)[0]
+
+def run_emotion_batch(texts):
+    outs = get_model("emotion_clf")(list(texts), batch_size=BATCH_SIZE)
+    return [{"label": out["label"], "score": out["score"]} for out in outs]
+
+def detect_emotion_batch(texts):
+    return cached("emotion", f"{INFERENCE_BACKEND}:{EMOTION_MODEL}", run_emotion_batch, texts)
 
 def detect_emotion(text):
     """
     Returns primary emotion label, e.g. 'sadness', 'joy', 'anger', ...
     """
-    out = emotion_clf(text)[0]
-    return {"label": out["label"], "score": out["score"]}
+    return detect_emotion_batch([text])[0]
+
+def normalize_for_safety(text):
+    """
+    Lowercases, drops apostrophes and collapses everything else that is not
+    a letter or digit to single spaces, so "Can't  go on" reads "cant go on".
+    """
+    text = text.lower().replace("'", "").replace("\u2019", "")
+    return re.sub(r"[^a-z0-9]+", " ", text)
+
+SAFETY_KEYWORD_LOOKUP = {normalize_for_safety(kw).strip(): kw for kw in SAFETY_KEYWORDS}
+SAFETY_PATTERN = re.compile("|".join(
+    re.escape(kw) for kw in sorted(SAFETY_KEYWORD_LOOKUP, key=len, reverse=True)
+))
 
 def simple_keyword_safety(text):
-    t = text.lower()
-    for kw in SAFETY_KEYWORDS:
-        if kw in t:
-            return True, kw
+    match = SAFETY_PATTERN.search(normalize_for_safety(text))
+    if match:
+        return True, SAFETY_KEYWORD_LOOKUP[match.group(0)]
     return False, None
 
+def self_harm_scores(name, texts):
+    """
+    Returns (self-harm probability, top label score) per text.
+    """
+    outs = as_list(get_model(name)(list(texts), SAFETY_LABELS, batch_size=BATCH_SIZE))
+    return [(dict(zip(out["labels"], out["scores"]))[SAFETY_LABELS[0]], out["scores"][0]) for out in outs]
+
+def run_safety_batch(texts):
+    """
+    Cascade: keyword hits are answered directly, the fast model settles
+    clear-cut texts, and only borderline ones reach the heavy zero-shot
+    model. Each stage runs as one batch.
+    """
+    results = [None] * len(texts)
+    pending = []
+    for i, text in enumerate(texts):
+        has_kw, kw = simple_keyword_safety(text)
+        if has_kw:
+            results[i] = {"high_risk": True, "reason": f"keyword:{kw}", "confidence": 0.99}
+            safety_stages["keyword"] += 1
+        else:
+            pending.append(i)
+
+    if pending and "safety_fast" in MODELS:
+        borderline = []
+        for i, (risk, confidence) in zip(pending, self_harm_scores("safety_fast", [texts[i] for i in pending])):
+            if risk >= SAFETY_FAST_HIGH:
+                results[i] = {"high_risk": True, "reason": "fast_selfharm", "confidence": float(risk)}
+            elif risk <= SAFETY_FAST_LOW:
+                results[i] = {"high_risk": False, "reason": "none_detected", "confidence": float(confidence)}
+            else:
+                borderline.append(i)
+                continue
+            safety_stages["fast"] += 1
+        pending = borderline
+
+    if pending:
+        for i, (risk, confidence) in zip(pending, self_harm_scores("safety_zero_shot", [texts[i] for i in pending])):
+            if risk > SAFETY_HEAVY_THRESHOLD:
+                results[i] = {"high_risk": True, "reason": "zero_shot_selfharm", "confidence": float(risk)}
+            else:
+                results[i] = {"high_risk": False, "reason": "none_detected", "confidence": float(confidence)}
+            safety_stages["heavy"] += 1
+    return results
+
+def safety_check_batch(texts):
+    version = f"{INFERENCE_BACKEND}:{NLI_MODEL}:{SAFETY_FAST_MODEL}:{SAFETY_FAST_LOW}:{SAFETY_FAST_HIGH}"
+    return cached("safety", version, run_safety_batch, texts)
+
 def safety_check(text):
-    has_kw, kw = simple_keyword_safety(text)
-    if has_kw:
-        return {"high_risk": True, "reason": f"keyword:{kw}", "confidence": 0.99}
-
-    candidate_labels = ["self-harm or suicidal", "not suicidal"]
-    out = safety_zero_shot(text, candidate_labels)
-    if out["labels"][0] == "self-harm or suicidal" and out["scores"][0] > 0.7:
-        return {"high_risk": True, "reason": "zero_shot_selfharm", "confidence": float(out["scores"][0])}
-    return {"high_risk": False, "reason": "none_detected", "confidence": float(out["scores"][0])}
+    return safety_check_batch([text])[0]
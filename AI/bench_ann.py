@@ -0,0 +1,82 @@
+"""
+Recall@k, query latency and memory of the approximate index types
+against the exact flat index, on clustered synthetic embeddings (or the
+vectors of an existing index with --index):
+
+    python bench_ann.py --vectors 100000 --queries 500 --k 4
+"""
+import argparse
+import time
+import numpy as np
+import faiss
+
+import build_knowledge_base as kb
+
+
+CONFIGS = [
+    ("flat", {}),
+    ("ivf_flat", {"nprobe": 4}),
+    ("ivf_flat", {"nprobe": 16}),
+    ("ivf_flat", {"nprobe": 64}),
+    ("ivf_pq", {"nprobe": 16}),
+    ("ivf_pq", {"nprobe": 64}),
+    ("hnsw", {"ef_search": 16}),
+    ("hnsw", {"ef_search": 64}),
+    ("hnsw", {"ef_search": 256}),
+]
+
+
+def clustered(n, d, clusters=200, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, d)).astype('float32')
+    points = centers[rng.integers(0, clusters, n)] + 0.5 * rng.standard_normal((n, d)).astype('float32')
+    faiss.normalize_L2(points)
+    return points
+
+
+def recall_at_k(found, truth):
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--index", help="take vectors from an existing flat index")
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.index:
+        source = faiss.read_index(args.index)
+        data = source.reconstruct_n(0, source.ntotal)
+    else:
+        data = clustered(args.vectors, args.dim)
+    queries = clustered(args.queries, data.shape[1], seed=1)
+
+    exact = faiss.IndexFlatIP(data.shape[1])
+    exact.add(data)
+    _, truth = exact.search(queries, args.k)
+
+    print(f"{len(data)} vectors, d={data.shape[1]}, {len(queries)} queries, k={args.k}")
+    print(f"{'index':>9} {'params':>16} {'recall@k':>9} {'ms/query':>9} {'MB':>8} {'build s':>8}")
+    built = {}
+    for index_type, search in CONFIGS:
+        if index_type not in built:
+            start = time.perf_counter()
+            index, spec = kb.make_index(data.shape[1], len(data), kb.index_spec(index_type))
+            if not index.is_trained:
+                index.train(data)
+            index.add(data)
+            built[index_type] = (index, spec, time.perf_counter() - start)
+        index, spec, build_seconds = built[index_type]
+        spec = dict(spec, **search)
+        kb.apply_search_params(index, spec)
+
+        start = time.perf_counter()
+        _, found = index.search(queries, args.k)
+        ms = (time.perf_counter() - start) * 1000 / len(queries)
+        mb = len(faiss.serialize_index(index)) / 2**20
+        params = ",".join(f"{k}={v}" for k, v in search.items()) or "-"
+        print(f"{spec['type']:>9} {params:>16} {recall_at_k(found, truth):>9.3f} {ms:>9.3f} {mb:>8.1f} {build_seconds:>8.1f}")
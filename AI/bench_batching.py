@@ -0,0 +1,87 @@
+"""
+Throughput and per-request latency of the classifiers at several
+concurrency levels, one forward pass per request (the previous
+behaviour) against the MicroBatcher:
+
+    python bench_batching.py --task safety --concurrency 1 4 16 64 --requests 256
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import Intent_Detection as intents
+from micro_batcher import MicroBatcher
+
+
+TASKS = {
+    "intent": (intents.detect_intent, intents.detect_intent_batch, ["zero_shot"]),
+    "emotion": (intents.detect_emotion, intents.detect_emotion_batch, ["emotion_clf"]),
+    "safety": (intents.safety_check, intents.safety_check_batch, [n for n in intents.MODELS if n.startswith("safety")]),
+}
+
+MESSAGES = [
+    "I have an exam tomorrow and I can't stop worrying about it",
+    "hello there",
+    "thanks, that breathing exercise really helped",
+    "I feel like nobody at college understands me",
+    "can you suggest someone I could talk to about stress",
+    "I haven't slept properly in a week",
+    "my roommate keeps ignoring me and it makes me sad",
+    "what are some ways to cope with loneliness",
+]
+
+
+async def run(call, concurrency, requests):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(n):
+        async with semaphore:
+            start = time.perf_counter()
+            await call(MESSAGES[n % len(MESSAGES)])
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(n) for n in range(requests)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+async def main(args):
+    single, batch, models = TASKS[args.task]
+    intents.result_cache.max_entries = 0  # time the models, not the cache
+    intents.warm_up(models)
+    executor = ThreadPoolExecutor(max_workers=1)
+    loop = asyncio.get_running_loop()
+
+    async def unbatched(text):
+        return await loop.run_in_executor(executor, single, text)
+
+    print(f"{'mode':>9} {'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'batch':>6}")
+    for concurrency in args.concurrency:
+        result = await run(unbatched, concurrency, args.requests)
+        print(f"{'single':>9} {concurrency:>5} {result['rps']:>8.1f} {result['p50']:>8.1f} {result['p95']:>8.1f} {1:>6}")
+
+        batcher = MicroBatcher(batch, args.max_batch, args.max_wait_ms, executor)
+        result = await run(batcher.submit, concurrency, args.requests)
+        await batcher.close()
+        print(f"{'batched':>9} {concurrency:>5} {result['rps']:>8.1f} {result['p50']:>8.1f} {result['p95']:>8.1f} "
+              f"{batcher.stats()['mean_batch_size']:>6}")
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--task", choices=TASKS, default="safety")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    asyncio.run(main(parser.parse_args()))
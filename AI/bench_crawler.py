@@ -0,0 +1,152 @@
+"""
+Crawler checks against local fixture servers (two "hosts" on different
+ports, hundreds of pages, with artificial latency). Verifies that every
+page arrives, that per-host concurrency and spacing are respected, that
+a re-crawl is served by 304s from the on-disk cache, and that changed
+pages are fetched again. Exits non-zero on any failure:
+
+    python bench_crawler.py --pages 400 --per-host 4 --latency-ms 20
+"""
+import argparse
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from crawler import Crawler, iter_crawl
+
+
+class Fixture:
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.versions = defaultdict(int)
+        self.lock = threading.Lock()
+        self.inflight = 0
+        self.max_inflight = 0
+        self.starts = []
+        self.statuses = defaultdict(int)
+
+    def handler(self):
+        fixture = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with fixture.lock:
+                    fixture.inflight += 1
+                    fixture.max_inflight = max(fixture.max_inflight, fixture.inflight)
+                    fixture.starts.append(time.monotonic())
+                try:
+                    time.sleep(fixture.latency)
+                    if self.path == "/robots.txt":
+                        self.send_response(404)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    page = int(self.path.rsplit("/", 1)[-1])
+                    version = fixture.versions[page]
+                    etag = f'"{page}-{version}"'
+                    if self.headers.get("If-None-Match") == etag:
+                        fixture.statuses[304] += 1
+                        self.send_response(304)
+                        self.send_header("ETag", etag)
+                        self.end_headers()
+                        return
+                    body = (f"<html><body><article><h1>Page {page}</h1>"
+                            f"<p>page {page} version {version}: notes on sleep, stress and study habits.</p>"
+                            f"<p>{'Students find small routines help. ' * 20}</p></article></body></html>").encode()
+                    fixture.statuses[200] += 1
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                    self.send_header("ETag", etag)
+                    self.send_header("Last-Modified", "Mon, 05 Oct 2026 10:00:00 GMT")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with fixture.lock:
+                        fixture.inflight -= 1
+
+        return Handler
+
+    def reset(self):
+        self.max_inflight = 0
+        self.starts = []
+        self.statuses.clear()
+
+
+def start_server(fixture):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), fixture.handler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def crawl(urls, cache_dir, per_host, delay=0):
+    crawler = Crawler(cache_dir=cache_dir, per_host=per_host, max_concurrency=4 * per_host, delay=delay)
+    start = time.perf_counter()
+    first = None
+    docs = []
+    for doc in iter_crawl(urls, crawler):
+        first = first or time.perf_counter() - start
+        docs.append(doc)
+    return docs, crawler.stats, time.perf_counter() - start, first
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--per-host", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    fixtures = [Fixture(args.latency_ms / 1000) for _ in range(2)]
+    servers = [start_server(f) for f in fixtures]
+    urls = [f"http://127.0.0.1:{servers[n % 2].server_port}/page/{n}" for n in range(args.pages)]
+    cache_dir = tempfile.mkdtemp()
+    failures = []
+
+    def check(ok, message):
+        if not ok:
+            failures.append(message)
+
+    docs, stats, seconds, first = crawl(urls, cache_dir, args.per_host)
+    print(f"cold crawl: {len(docs)} docs in {seconds:.2f}s ({len(docs) / seconds:.0f} pages/s), "
+          f"first doc after {first * 1000:.0f} ms, {dict(stats)}")
+    check(len(docs) == args.pages, f"cold crawl returned {len(docs)} of {args.pages} pages")
+    check(all(f"page {d['url'].rsplit('/', 1)[-1]} version 0" in d["text"] for d in docs), "page text mismatch")
+    for n, f in enumerate(fixtures):
+        print(f"  host {n}: max {f.max_inflight} requests in flight (limit {args.per_host})")
+        check(f.max_inflight <= args.per_host, f"host {n} saw {f.max_inflight} concurrent requests")
+
+    for f in fixtures:
+        f.reset()
+    docs, stats, seconds, _ = crawl(urls, cache_dir, args.per_host)
+    print(f"revalidation: {len(docs)} docs in {seconds:.2f}s, {dict(stats)}")
+    check(len(docs) == args.pages, "re-crawl lost pages")
+    check(stats["not_modified"] == args.pages and stats["fetched"] == 0, "re-crawl did not use the cache")
+
+    changed = list(range(0, args.pages, max(1, args.pages // 10)))
+    for n in changed:
+        fixtures[n % 2].versions[n] += 1
+    docs, stats, seconds, _ = crawl(urls, cache_dir, args.per_host)
+    print(f"after {len(changed)} edits: {dict(stats)}")
+    check(stats["fetched"] == len(changed), f"expected {len(changed)} refetches, got {stats['fetched']}")
+    texts = {d["url"]: d["text"] for d in docs}
+    check(all("version 1" in texts[urls[n]] for n in changed), "changed pages not refreshed")
+
+    delay = 0.05
+    fixtures[0].reset()
+    crawl(urls[:40:2], tempfile.mkdtemp(), args.per_host, delay=delay)
+    gaps = [b - a for a, b in zip(fixtures[0].starts, fixtures[0].starts[1:])]
+    print(f"politeness: min gap between requests to one host {min(gaps) * 1000:.0f} ms (delay {delay * 1000:.0f} ms)")
+    check(min(gaps) >= delay * 0.9, "requests to one host were not spaced out")
+
+    for server in servers:
+        server.shutdown()
+    for f in failures:
+        print("FAIL: " + f)
+    raise SystemExit(1 if failures else 0)
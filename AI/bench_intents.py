@@ -0,0 +1,85 @@
+"""
+Offline comparison of the two intent engines on a labelled set: accuracy
+against the expected label, agreement with the zero-shot output, and
+per-message latency. A JSONL file of {"text", "label"} rows can replace
+the built-in sample:
+
+    python bench_intents.py [--data intents.jsonl] [--batch 16]
+"""
+import argparse
+import json
+import time
+
+import Intent_Detection as intents
+import intent_embeddings
+
+
+SAMPLE = [
+    ("hey there", "greeting"),
+    ("good evening!", "greeting"),
+    ("ok bye, talk later", "goodbye"),
+    ("I'm logging off for tonight", "goodbye"),
+    ("what do you do for fun", "smalltalk"),
+    ("are you a robot", "smalltalk"),
+    ("do you have any reading material on burnout", "ask-resource"),
+    ("link me to something about managing exam stress", "ask-resource"),
+    ("my chest gets tight whenever I think about the interview", "feel_anxious"),
+    ("I keep overthinking everything and can't relax", "feel_anxious"),
+    ("I feel worthless and tired of everything", "feel_depressed"),
+    ("I haven't enjoyed anything in months", "feel_depressed"),
+    ("what can I do when I feel overwhelmed", "seek_coping"),
+    ("teach me a way to relax before sleeping", "seek_coping"),
+    ("I'd like to speak with a psychologist", "ask_for_professional_help"),
+    ("is there a counsellor on campus I could see", "ask_for_professional_help"),
+    ("I've been thinking about hurting myself", "self_harm_ideation"),
+    ("sometimes I wish I could just disappear forever", "self_harm_ideation"),
+    ("thanks a lot, really", "gratitude"),
+    ("that was helpful, I appreciate it", "gratitude"),
+    ("fine", "neutral"),
+    ("alright then", "neutral"),
+]
+
+
+def load(path):
+    if not path:
+        return SAMPLE
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [(r["text"], r["label"]) for r in rows]
+
+
+def run(mode, texts, batch):
+    intents.detect_intent_batch(texts[:1], mode=mode)  # load models / centroids
+    start = time.perf_counter()
+    labels = []
+    for i in range(0, len(texts), batch):
+        labels += [r["label"] for r in intents.detect_intent_batch(texts[i:i + batch], mode=mode)]
+    return labels, (time.perf_counter() - start) / len(texts) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data")
+    parser.add_argument("--batch", type=int, default=1)
+    args = parser.parse_args()
+
+    intents.result_cache.max_entries = 0  # time the models, not the cache
+    rows = load(args.data)
+    texts = [t for t, _ in rows]
+    gold = [l for _, l in rows]
+
+    zero_shot, zs_ms = run("zero_shot", texts, args.batch)
+    embedding, emb_ms = run("embedding", texts, args.batch)
+
+    def accuracy(pred):
+        return sum(p == g for p, g in zip(pred, gold)) / len(gold)
+
+    agreement = sum(a == b for a, b in zip(zero_shot, embedding)) / len(texts)
+    print(f"{len(texts)} messages, batch {args.batch}, embedding model {intent_embeddings.INTENT_EMBEDDING_MODEL}")
+    print(f"{'engine':>10} {'accuracy':>9} {'ms/msg':>8}")
+    print(f"{'zero_shot':>10} {accuracy(zero_shot):>9.2%} {zs_ms:>8.1f}")
+    print(f"{'embedding':>10} {accuracy(embedding):>9.2%} {emb_ms:>8.1f}")
+    print(f"agreement with zero_shot: {agreement:.2%}")
+    for text, g, z, e in zip(texts, gold, zero_shot, embedding):
+        if e != g:
+            print(f"  {text!r}: expected {g}, embedding {e}, zero_shot {z}")
@@ -0,0 +1,88 @@
+"""
+Knowledge-base query latency: the original path (new SentenceTransformer
+and index reload per question), a cold KnowledgeBase (first question
+after start), and a warm one for new and repeated questions. Builds a
+throwaway index from synthetic documents unless --index/--chunks point
+at a real one:
+
+    python bench_kb.py [--questions 50] [--batch 16]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import build_knowledge_base as kb
+
+
+TOPICS = ["sleep", "exam stress", "loneliness", "anxiety", "depression", "breathing", "friendship", "burnout"]
+
+
+def synthetic_docs(n=40, seed=3):
+    rng = random.Random(seed)
+    docs = []
+    for i in range(n):
+        topic = rng.choice(TOPICS)
+        sentences = [f"Students dealing with {topic} often find that small routines help a great deal over time."
+                     for _ in range(30)]
+        docs.append({"source": f"doc{i}", "text": " ".join(sentences), "tags": [topic]})
+    return docs
+
+
+def legacy_query(index_path, chunks_path, text):
+    from sentence_transformers import SentenceTransformer
+    index, chunks_meta = kb.load_index(index_path, chunks_path)
+    model = SentenceTransformer(kb.EMBEDDING_MODEL)
+    q_emb = model.encode([text], convert_to_numpy=True)
+    kb.faiss.normalize_L2(q_emb)
+    index.search(q_emb.astype('float32'), 4)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--index")
+    parser.add_argument("--chunks")
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--batch", type=int, default=16)
+    parser.add_argument("--legacy-runs", type=int, default=3)
+    args = parser.parse_args()
+
+    index_path, chunks_path = args.index, args.chunks
+    if not index_path:
+        tmp = tempfile.mkdtemp()
+        index_path = os.path.join(tmp, "kb.index")
+        chunks_path = os.path.join(tmp, "kb_chunks.bin")
+        kb.build_from_texts(synthetic_docs(), index_path=index_path, chunks_path=chunks_path,
+                            embeddings_path=os.path.join(tmp, "kb_embeddings.npz"))
+        kb.registry.pipelines.clear()  # so the cold run really is cold
+
+    questions = [f"how do I deal with {random.choice(TOPICS)} number {i}" for i in range(args.questions)]
+
+    legacy = [timed(legacy_query, index_path, chunks_path, q) for q in questions[:args.legacy_runs]]
+
+    knowledge_base = kb.KnowledgeBase(index_path=index_path, chunks_path=chunks_path)
+    cold = timed(knowledge_base.query, questions[0])
+    warm = [timed(knowledge_base.query, q) for q in questions[1:]]
+    cached = [timed(knowledge_base.query, q) for q in questions[1:]]
+
+    fresh = [f"{q} again" for q in questions]
+    start = time.perf_counter()
+    for i in range(0, len(fresh), args.batch):
+        knowledge_base.search(fresh[i:i + args.batch])
+    batched = (time.perf_counter() - start) * 1000 / len(fresh)
+
+    print(f"{'path':>24} {'ms/query':>9}")
+    print(f"{'legacy (reload per call)':>24} {statistics.median(legacy):>9.1f}")
+    print(f"{'cold KnowledgeBase':>24} {cold:>9.1f}")
+    print(f"{'warm, new question':>24} {statistics.median(warm):>9.2f}")
+    print(f"{'warm, cached question':>24} {statistics.median(cached):>9.3f}")
+    print(f"{f'warm, batch of {args.batch}':>24} {batched:>9.2f}")
+    print(knowledge_base.stats())
@@ -0,0 +1,91 @@
+"""
+Memory taken by N worker processes that each open the knowledge base
+and answer queries, with the memory-mapped chunk store and index against
+the old layout (pickled chunks, index read into RAM). Uses synthetic
+chunks and random query vectors, so no embedding model is loaded:
+
+    python bench_kb_memory.py --workers 4 --chunks 50000
+"""
+import argparse
+import multiprocessing
+import os
+import pickle
+import tempfile
+import numpy as np
+import faiss
+import psutil
+
+import build_knowledge_base as kb
+
+
+def make_corpus(path, n, dim, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = rng.choice(2**62, size=n, replace=False)
+    vectors = rng.standard_normal((n, dim)).astype('float32')
+    faiss.normalize_L2(vectors)
+    words = ["sleep", "stress", "exam", "friends", "routine", "breathing", "support", "campus"]
+    entries = {
+        int(i): (" ".join(words[(j + k) % len(words)] for k in range(120)), {"source": f"doc{j // 20}", "tags": []})
+        for j, i in enumerate(ids)
+    }
+
+    index, spec = kb.build_index(ids, vectors, kb.index_spec("flat"))
+    kb.write_index(index, spec, os.path.join(path, "kb.index"))
+    kb.save_chunks(entries, os.path.join(path, "kb_chunks.bin"))
+    with open(os.path.join(path, "kb_chunks.pkl"), "wb") as f:
+        pickle.dump(entries, f)
+
+
+def worker(mode, path, dim, queries, barrier, results):
+    process = psutil.Process()
+    before = process.memory_full_info()
+    if mode == "mmap":
+        index, chunks = kb.load_index(os.path.join(path, "kb.index"), os.path.join(path, "kb_chunks.bin"))
+    else:
+        index = faiss.read_index(os.path.join(path, "kb.index"))
+        with open(os.path.join(path, "kb_chunks.pkl"), "rb") as f:
+            chunks = pickle.load(f)
+
+    rng = np.random.default_rng(os.getpid())
+    q = rng.standard_normal((queries, dim)).astype('float32')
+    faiss.normalize_L2(q)
+    distances, indices = index.search(q, 4)
+    found = sum(len(kb.collect_results(chunks, d, i)) for d, i in zip(distances, indices))
+
+    barrier.wait()  # measure while every worker is alive, so shared pages are split
+    after = process.memory_full_info()
+    results.put((after.rss - before.rss, after.uss - before.uss, getattr(after, "pss", 0) - getattr(before, "pss", 0), found))
+    barrier.wait()
+
+
+def run(mode, path, args):
+    barrier = multiprocessing.Barrier(args.workers)
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=worker, args=(mode, path, args.dim, args.queries, barrier, results))
+             for _ in range(args.workers)]
+    for p in procs:
+        p.start()
+    rows = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return [sum(r[i] for r in rows) / 2**20 for i in range(3)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    path = tempfile.mkdtemp()
+    make_corpus(path, args.chunks, args.dim)
+    sizes = {name: os.path.getsize(os.path.join(path, name)) / 2**20
+             for name in ("kb.index", "kb_chunks.bin", "kb_chunks.pkl")}
+    print(f"{args.chunks} chunks, {args.workers} workers; files (MB): "
+          + ", ".join(f"{k} {v:.1f}" for k, v in sizes.items()))
+    print(f"{'layout':>8} {'sum RSS MB':>11} {'sum USS MB':>11} {'sum PSS MB':>11}")
+    for mode in ("pickle", "mmap"):
+        rss, uss, pss = run(mode, path, args)
+        print(f"{mode:>8} {rss:>11.1f} {uss:>11.1f} {pss:>11.1f}")
@@ -0,0 +1,69 @@
+"""
+Per-message latency of the rule-based intent matcher as the number of
+patterns grows, comparing the original per-pattern NLTK loop with the
+compiled inverted index in Custom_Chatbot_Module:
+
+    python bench_matcher.py --sizes 100 1000 5000 --messages 200
+"""
+import argparse
+import random
+import time
+from nltk.tokenize import word_tokenize
+
+import Custom_Chatbot_Module as rules
+
+
+def legacy_match(user_message, knowledge_base):
+    tokens = word_tokenize(user_message.lower())
+    lemmatized_tokens = [rules.lemmatizer.lemmatize(token) for token in tokens]
+
+    best_intent = None
+    best_score = 0
+    for intent, data in knowledge_base.items():
+        score = 0
+        for pattern in data["patterns"]:
+            pattern_tokens = [rules.lemmatizer.lemmatize(word) for word in word_tokenize(pattern.lower())]
+            score += sum(1 for word in pattern_tokens if word in lemmatized_tokens)
+        if score > best_score:
+            best_score = score
+            best_intent = intent
+    return best_intent, best_score
+
+
+def synthetic_base(pattern_count, intents=50, vocab=5000, seed=7):
+    rng = random.Random(seed)
+    words = [f"word{i}" for i in range(vocab)]
+    base = {f"intent{i}": {"patterns": [], "responses": ["ok"]} for i in range(intents)}
+    for n in range(pattern_count):
+        base[f"intent{n % intents}"]["patterns"].append(" ".join(rng.sample(words, rng.randint(1, 4))))
+    messages = [" ".join(rng.sample(words, rng.randint(3, 15))) for _ in range(1000)]
+    return base, messages
+
+
+def time_per_message(match, base, messages):
+    start = time.perf_counter()
+    for m in messages:
+        match(m, base)
+    return (time.perf_counter() - start) / len(messages) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--messages", type=int, default=200)
+    args = parser.parse_args()
+
+    rules.ensure_nltk_data()
+    print(f"{'patterns':>9} {'legacy ms/msg':>14} {'indexed ms/msg':>15} {'compile ms':>11} {'agree':>6}")
+    for size in args.sizes:
+        base, messages = synthetic_base(size)
+        messages = messages[:args.messages]
+
+        start = time.perf_counter()
+        rules.compile_knowledge_base(base)
+        compile_ms = (time.perf_counter() - start) * 1000
+
+        agree = all(legacy_match(m, base) == rules.match_intent(m, base) for m in messages[:50])
+        legacy = time_per_message(legacy_match, base, messages)
+        indexed = time_per_message(rules.match_intent, base, messages)
+        print(f"{size:>9} {legacy:>14.3f} {indexed:>15.4f} {compile_ms:>11.1f} {str(agree):>6}")
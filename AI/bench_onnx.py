@@ -0,0 +1,94 @@
+"""
+Parity and speed check of the ONNX Runtime backend against PyTorch. Runs
+detect_emotion, detect_intent and safety_check on the same messages
+with each backend, and reports label agreement, per-message latency on
+one core, and the memory taken by the loaded models. Exits non-zero if
+agreement drops below --min-agreement:
+
+    python bench_onnx.py [--threads 1] [--min-agreement 0.95]
+"""
+import argparse
+import time
+
+import Intent_Detection as intents
+from model_registry import registry, rss_bytes, rss_delta
+
+
+MESSAGES = [
+    "I have an exam tomorrow and I can't stop worrying about it",
+    "hello there",
+    "thanks, that breathing exercise really helped",
+    "I feel like nobody at college understands me",
+    "can you suggest someone I could talk to about stress",
+    "I haven't slept properly in a week",
+    "my roommate keeps ignoring me and it makes me sad",
+    "what are some ways to cope with loneliness",
+    "I'm so angry at my professor right now",
+    "I got the internship, I'm so happy!",
+    "I don't see the point of anything anymore",
+    "is there a counsellor I can book",
+    "ok",
+    "that movie was disgusting",
+    "I'm scared of failing this semester",
+    "bye, talk tomorrow",
+]
+
+CHECKS = {
+    "emotion": lambda text: intents.detect_emotion(text)["label"],
+    "intent": lambda text: intents.detect_intent(text)["label"],
+    "safety": lambda text: intents.safety_check(text)["high_risk"],
+}
+
+
+def use_backend(backend):
+    for name, (task, model, _) in list(intents.MODELS.items()):
+        intents.MODELS[name] = (task, model, backend)
+
+
+def run(backend):
+    use_backend(backend)
+    rss_before = rss_bytes()
+    intents.warm_up()
+    rss_mb = rss_delta(rss_before, rss_bytes())
+
+    outputs = {}
+    timings = {}
+    for check, fn in CHECKS.items():
+        fn(MESSAGES[0])
+        start = time.perf_counter()
+        outputs[check] = [fn(text) for text in MESSAGES]
+        timings[check] = (time.perf_counter() - start) / len(MESSAGES) * 1000
+    return outputs, timings, rss_mb
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    args = parser.parse_args()
+
+    import torch
+    torch.set_num_threads(args.threads)
+    import onnx_backend
+    onnx_backend.ONNX_THREADS = args.threads
+    intents.result_cache.max_entries = 0  # time the models, not the cache
+
+    torch_out, torch_ms, torch_rss = run("torch")
+    onnx_out, onnx_ms, onnx_rss = run("onnx")
+
+    print(f"{len(MESSAGES)} messages, {args.threads} thread(s), int8={onnx_backend.ONNX_QUANTIZE}")
+    print(f"{'check':>8} {'agree':>7} {'torch ms':>9} {'onnx ms':>8} {'speedup':>8}")
+    worst = 1.0
+    for check in CHECKS:
+        agree = sum(a == b for a, b in zip(torch_out[check], onnx_out[check])) / len(MESSAGES)
+        worst = min(worst, agree)
+        print(f"{check:>8} {agree:>7.2%} {torch_ms[check]:>9.1f} {onnx_ms[check]:>8.1f} "
+              f"{torch_ms[check] / onnx_ms[check]:>7.2f}x")
+        for text, a, b in zip(MESSAGES, torch_out[check], onnx_out[check]):
+            if a != b:
+                print(f"    {text!r}: torch {a}, onnx {b}")
+
+    print(f"rss added by models (MB): torch {torch_rss}, onnx {onnx_rss}")
+    for stats in registry.report()["loaded"]:
+        print(f"  {stats['backend']:>5} {stats['model']}: {stats['parameter_mb']} MB weights, {stats['load_seconds']}s load")
+    raise SystemExit(1 if worst < args.min_agreement else 0)
@@ -0,0 +1,102 @@
+"""
+Regression corpus for the safety cascade. Runs every message through the
+original check (substring keywords, then the heavy zero-shot model every
+time) and through the cascade, and fails if the cascade misses any
+at-risk message the original caught or if its median latency is not
+lower:
+
+    python bench_safety.py [--repeat 3]
+"""
+import argparse
+import statistics
+import time
+
+import Intent_Detection as intents
+
+
+AT_RISK = [
+    "I want to kill myself",
+    "i cant go on like this",
+    "I can't  go on anymore",
+    "sometimes I think about suicide",
+    "I just want to die",
+    "I want to   die tonight",
+    "I've been cutting myself again, I cut myself yesterday",
+    "thinking of taking an overdose of my pills",
+    "I don't see the point in living anymore",
+    "everyone would be better off if I was gone",
+    "I want to end my life",
+    "I keep hurting myself when I'm upset",
+    "I have a plan to hang myself",
+    "I wish I could go to sleep and never wake up",
+]
+
+SAFE = [
+    "hello",
+    "thanks for the help",
+    "I have an exam tomorrow and I'm stressed",
+    "my roommate is annoying",
+    "how do I manage my time better",
+    "I feel a bit lonely after moving to a new city",
+    "can you suggest a breathing exercise",
+    "I failed my test and I'm disappointed",
+    "this assignment is killing me lol",
+    "I'm tired of waiting for my results",
+    "what are some good study habits",
+    "I want to talk to a mentor about career choices",
+]
+
+
+def legacy_check(text):
+    t = text.lower()
+    for kw in intents.SAFETY_KEYWORDS:
+        if kw in t:
+            return True
+    risk, _ = intents.self_harm_scores("safety_zero_shot", [text])[0]
+    return risk > intents.SAFETY_HEAVY_THRESHOLD
+
+
+def cascade_check(text):
+    return intents.safety_check(text)["high_risk"]
+
+
+def measure(check, messages, repeat):
+    flagged = {}
+    latencies = []
+    for _ in range(repeat):
+        for text in messages:
+            start = time.perf_counter()
+            flagged[text] = check(text)
+            latencies.append(time.perf_counter() - start)
+    return flagged, statistics.median(latencies) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    intents.result_cache.max_entries = 0  # time the models, not the cache
+    intents.warm_up([n for n in intents.MODELS if n.startswith("safety")])
+    messages = AT_RISK + SAFE
+    legacy, legacy_ms = measure(legacy_check, messages, args.repeat)
+    intents.safety_stages.clear()
+    cascade, cascade_ms = measure(cascade_check, messages, args.repeat)
+
+    def recall(flagged):
+        return sum(flagged[t] for t in AT_RISK) / len(AT_RISK)
+
+    def false_positives(flagged):
+        return sum(flagged[t] for t in SAFE)
+
+    print(f"{'check':>8} {'recall':>7} {'false+':>7} {'p50 ms':>8}")
+    print(f"{'legacy':>8} {recall(legacy):>7.2%} {false_positives(legacy):>7} {legacy_ms:>8.1f}")
+    print(f"{'cascade':>8} {recall(cascade):>7.2%} {false_positives(cascade):>7} {cascade_ms:>8.1f}")
+    print(f"stage hits: {dict(intents.safety_stages)}")
+
+    regressions = [t for t in AT_RISK if legacy[t] and not cascade[t]]
+    for t in regressions:
+        print(f"  missed by cascade: {t!r}")
+    if cascade_ms >= legacy_ms:
+        print("  cascade median latency did not drop")
+    raise SystemExit(1 if regressions or cascade_ms >= legacy_ms else 0)
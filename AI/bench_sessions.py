@@ -0,0 +1,52 @@
+"""
+Concurrency check for ChatSession: thousands of simulated sessions talk
+to the rule-based bot at once, and every session must see its own
+followup acknowledgement and never another session's. Also reports
+throughput and the size of the store after TTL/cap eviction:
+
+    python bench_sessions.py --sessions 5000 --threads 64
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import Custom_Chatbot_Module as rules
+
+
+def converse(store, n):
+    session = rules.ChatSession(f"session-{n}", store)
+    intent, _ = session.respond("thank you")
+    if intent != "gratitude":
+        return f"session-{n}: expected gratitude, got {intent}"
+
+    marker = f"marker{n}"
+    intent, reply = session.respond(marker)
+    if intent != "followup" or marker not in reply:
+        return f"session-{n}: followup lost or leaked ({intent}: {reply})"
+
+    intent, _ = session.respond("hello")
+    if intent != "greetings":
+        return f"session-{n}: followup flag was not cleared ({intent})"
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--max-sessions", type=int, default=rules.SESSION_MAX)
+    args = parser.parse_args()
+
+    rules.compile_knowledge_base(rules.knowledge_base)
+    store = rules.MemorySessionStore(max_sessions=args.max_sessions)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        failures = [f for f in pool.map(lambda n: converse(store, n), range(args.sessions)) if f]
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.sessions} sessions, {args.sessions * 3 / elapsed:.0f} messages/s, "
+          f"{len(store)} sessions kept, {len(failures)} failures")
+    for f in failures[:10]:
+        print("  " + f)
+    raise SystemExit(1 if failures else 0)
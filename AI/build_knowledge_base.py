@@ -1,14 +1,20 @@
 
 import os
-import pickle
+import hashlib
+import json
+import mmap
+import threading
+import time
+from collections import OrderedDict
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import faiss
 import nltk
 from nltk.tokenize import sent_tokenize
 import logging
 import requests
-from bs4 import BeautifulSoup
+
+from crawler import IncompleteCrawl, extract_text, iter_crawl, pick_parser
+from model_registry import registry
 
 logging.basicConfig(level=logging.INFO)
 
@@ -16,7 +22,15 @@ nltk.download('punkt', quiet=True)
 
 EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
 INDEX_FILE = os.environ.get("KB_INDEX_PATH", "knowledge_base.index")
-CHUNKS_FILE = os.environ.get("KB_CHUNKS_PATH", "kb_chunks.pkl")
+CHUNKS_FILE = os.environ.get("KB_CHUNKS_PATH", "kb_chunks.bin")
+# flat (exact), ivf_flat, ivf_pq or hnsw; see index_spec() for the knobs.
+INDEX_TYPE = os.environ.get("KB_INDEX_TYPE", "flat")
+EMBEDDINGS_FILE = os.environ.get("KB_EMBEDDINGS_PATH", "kb_embeddings.npz")
+ENCODE_BATCH_SIZE = int(os.environ.get("KB_ENCODE_BATCH_SIZE", "32"))
+QUERY_CACHE_SIZE = int(os.environ.get("KB_QUERY_CACHE_SIZE", "1024"))
+# Map the FAISS index from disk instead of copying it into each process.
+INDEX_MMAP = os.environ.get("KB_INDEX_MMAP", "1") == "1"
+RELOAD_SECONDS = float(os.environ.get("KB_RELOAD_SECONDS", "5"))
 D = None  
 
 def chunk_text(text, max_words=200, overlap_words=30):
@@ -45,88 +59,424 @@ def scrape_article(url):
     try:
         r = requests.get(url, timeout=12)
         r.raise_for_status()
-        soup = BeautifulSoup(r.text, "html.parser")
-        article = soup.find("article")
-        if article:
-            paragraphs = article.find_all("p")
-        else:
-            paragraphs = soup.find_all("p")
-        text = " ".join([p.get_text(" ", strip=True) for p in paragraphs])
+        text = extract_text(r.text, pick_parser())
         logging.info(f"Scraped {len(text)} characters.")
         return text
     except Exception as e:
         logging.warning(f"Failed to scrape: {e}")
         return ""
 
+def load_model(model_name=EMBEDDING_MODEL):
+    # Shared with any other caller of the same encoder (e.g. intent_embeddings).
+    return registry.get("sentence-embedding", model_name)
+
 def embed_chunks(chunks, model_name=EMBEDDING_MODEL):
     logging.info(f"Loading embedding model: {model_name}")
-    model = SentenceTransformer(model_name)
-    embeddings = model.encode(chunks, show_progress_bar=True, convert_to_numpy=True)
+    model = load_model(model_name)
+    embeddings = model.encode(chunks, batch_size=ENCODE_BATCH_SIZE, show_progress_bar=True, convert_to_numpy=True)
     logging.info(f"Embeddings shape: {embeddings.shape}")
     return embeddings, model
 
-def create_faiss_index(embeddings, index_path=INDEX_FILE):
-    d = embeddings.shape[1]
-    index = faiss.IndexFlatIP(d)  
+def index_spec(index_type=INDEX_TYPE, **overrides):
+    spec = {
+        "type": index_type,
+        "nlist": int(os.environ.get("KB_NLIST", "256")),
+        "nprobe": int(os.environ.get("KB_NPROBE", "16")),
+        "pq_m": int(os.environ.get("KB_PQ_M", "16")),
+        "pq_bits": int(os.environ.get("KB_PQ_BITS", "8")),
+        "hnsw_m": int(os.environ.get("KB_HNSW_M", "32")),
+        "ef_construction": int(os.environ.get("KB_EF_CONSTRUCTION", "80")),
+        "ef_search": int(os.environ.get("KB_EF_SEARCH", "64")),
+    }
+    spec.update(overrides)
+    return spec
+
+def spec_path(index_path):
+    return f"{index_path}.json"
+
+def pq_min_vectors(spec):
+    return 2 ** spec["pq_bits"] * 39
+
+def make_index(d, n, spec):
+    """
+    Returns an empty inner-product index for `n` vectors of dimension `d`
+    and the spec actually used: IVF list counts are capped so that every
+    list gets enough training points, and corpora too small to train
+    IVF-PQ's codebooks fall back to exact search, with the type asked for
+    kept as "requested_type".
+    """
+    spec = dict(spec)
+    if spec["type"] in ("ivf_flat", "ivf_pq"):
+        spec["nlist"] = max(1, min(spec["nlist"], n // 39))
+        if spec["type"] == "ivf_pq" and n < pq_min_vectors(spec):
+            logging.warning(f"{n} chunks are too few to train IVF-PQ; using a flat index")
+            spec["requested_type"] = spec["type"]
+            spec["type"] = "flat"
+
+    if spec["type"] == "flat":
+        return faiss.IndexFlatIP(d), spec
+    if spec["type"] == "hnsw":
+        index = faiss.IndexHNSWFlat(d, spec["hnsw_m"], faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = spec["ef_construction"]
+        return index, spec
+    quantizer = faiss.IndexFlatIP(d)
+    if spec["type"] == "ivf_flat":
+        return faiss.IndexIVFFlat(quantizer, d, spec["nlist"], faiss.METRIC_INNER_PRODUCT), spec
+    if spec["type"] == "ivf_pq":
+        return faiss.IndexIVFPQ(quantizer, d, spec["nlist"], spec["pq_m"], spec["pq_bits"], faiss.METRIC_INNER_PRODUCT), spec
+    raise ValueError(f"Unknown index type: {spec['type']}")
+
+def apply_search_params(index, spec):
+    # ParameterSpace also reaches through wrappers such as IndexIDMap.
+    if spec["type"] in ("ivf_flat", "ivf_pq"):
+        faiss.ParameterSpace().set_index_parameter(index, "nprobe", spec["nprobe"])
+    elif spec["type"] == "hnsw":
+        faiss.ParameterSpace().set_index_parameter(index, "efSearch", spec["ef_search"])
+    return index
+
+def replace_file(path, write):
+    """
+    Writes through `write(tmp_path)` and renames over `path`, so readers
+    see either the old file or the new one, never a partial write.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+def chunk_id(source, chunk):
+    # 63-bit content hash, usable as a FAISS id.
+    digest = hashlib.sha1(f"{source}\0{chunk}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") & (2**63 - 1)
+
+def build_index(ids, embeddings, spec):
+    """
+    Fresh ID-mapped index over `embeddings` (unit length, float32).
+    """
+    index, spec = make_index(embeddings.shape[1], len(embeddings), spec)
+    if not index.is_trained:
+        index.train(embeddings)
+    spec["trained_on"] = len(embeddings)
+    index = faiss.IndexIDMap2(index)
+    index.add_with_ids(embeddings, np.asarray(ids, dtype=np.int64))
+    return apply_search_params(index, spec), spec
+
+def write_index(index, spec, index_path=INDEX_FILE):
+    def write_spec(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump(spec, f)
+    replace_file(spec_path(index_path), write_spec)
+    replace_file(index_path, lambda tmp: faiss.write_index(index, tmp))
+    logging.info(f"Saved {spec['type']} FAISS index ({index.ntotal} vectors) to {index_path}")
+
+def create_faiss_index(embeddings, index_path=INDEX_FILE, spec=None, ids=None):
     faiss.normalize_L2(embeddings)
-    index.add(embeddings.astype('float32'))
-    faiss.write_index(index, index_path)
-    logging.info(f"Saved FAISS index to {index_path}")
+    embeddings = embeddings.astype('float32')
+    ids = np.arange(len(embeddings)) if ids is None else ids
+    index, spec = build_index(ids, embeddings, spec or index_spec())
+    write_index(index, spec, index_path)
     return index
 
+def sync_index(store, index_path=INDEX_FILE, spec=None):
+    """
+    Brings the index at `index_path` in line with `store` ({id: vector}):
+    vectors for ids no longer present are removed and new ones added. The
+    index is rebuilt from the stored vectors (no re-embedding) when there
+    is none yet, the type changed, HNSW would need removals, an IVF
+    index has outgrown the data it was trained on fourfold, or a flat
+    stand-in for IVF-PQ now has enough vectors to train the real thing.
+    """
+    spec = spec or index_spec()
+    wanted = set(store)
+    index = None
+    if os.path.exists(index_path) and os.path.exists(spec_path(index_path)):
+        with open(spec_path(index_path)) as f:
+            old_spec = json.load(f)
+        if old_spec.get("requested_type", old_spec["type"]) == spec["type"]:
+            index = faiss.read_index(index_path)
+            if not hasattr(index, "id_map"):
+                index = None
+
+    if index is not None:
+        present = set(faiss.vector_to_array(index.id_map).tolist())
+        removed = present - wanted
+        added = [i for i in store if i not in present]
+        built = old_spec["type"]
+        outgrown = built in ("ivf_flat", "ivf_pq") and len(wanted) > 4 * old_spec.get("trained_on", 0)
+        trainable = built != spec["type"] and len(wanted) >= pq_min_vectors(spec)
+        if (removed and built == "hnsw") or outgrown or trainable:
+            index = None
+        else:
+            if removed:
+                index.remove_ids(np.fromiter(removed, dtype=np.int64, count=len(removed)))
+            if added:
+                index.add_with_ids(np.vstack([store[i] for i in added]), np.asarray(added, dtype=np.int64))
+            spec = dict(old_spec, nprobe=spec["nprobe"], ef_search=spec["ef_search"])
+            logging.info(f"Index updated in place: +{len(added)} -{len(removed)} vectors")
+            return apply_search_params(index, spec), spec
+
+    ids = list(store)
+    if not ids:
+        raise ValueError("No chunks to index.")
+    return build_index(ids, np.vstack([store[i] for i in ids]), spec)
+
+def load_embedding_store(embeddings_path=EMBEDDINGS_FILE, model_name=EMBEDDING_MODEL):
+    if not os.path.exists(embeddings_path):
+        return {}
+    data = np.load(embeddings_path)
+    if str(data["model"]) != model_name:
+        logging.info(f"Embedding cache was built with {data['model']}; re-embedding everything")
+        return {}
+    return dict(zip(data["ids"].tolist(), data["vectors"]))
+
+def save_embedding_store(store, embeddings_path=EMBEDDINGS_FILE, model_name=EMBEDDING_MODEL):
+    ids = np.fromiter(store, dtype=np.int64, count=len(store))
+    vectors = np.vstack(list(store.values())).astype('float32')
+
+    def write(tmp_path):
+        with open(tmp_path, "wb") as f:
+            np.savez(f, model=np.array(model_name), ids=ids, vectors=vectors)
+    replace_file(embeddings_path, write)
+
+CHUNK_STORE_MAGIC = b"KBCHUNK1"
+CHUNK_TABLE_DTYPE = np.dtype([("id", "<i8"), ("offset", "<i8"), ("length", "<i8")])
+
 def save_chunks(chunks, chunks_path=CHUNKS_FILE):
-    with open(chunks_path, "wb") as f:
-        pickle.dump(chunks, f)
-    logging.info(f"Saved chunk metadata to {chunks_path}")
+    """
+    Writes {chunk id: (chunk, meta)} as one file: a 16-byte header (magic,
+    record count), a table of (id, offset, length) sorted by id, then the
+    UTF-8 JSON records back to back. See ChunkStore for the reader.
+    """
+    ids = sorted(chunks)
+    records = [json.dumps(chunks[i], ensure_ascii=False).encode("utf-8") for i in ids]
+    table = np.zeros(len(ids), dtype=CHUNK_TABLE_DTYPE)
+    table["id"] = ids
+    table["length"] = [len(r) for r in records]
+    table["offset"] = np.concatenate(([0], np.cumsum(table["length"])[:-1])) if ids else []
+
+    def write(tmp_path):
+        with open(tmp_path, "wb") as f:
+            f.write(CHUNK_STORE_MAGIC)
+            f.write(np.uint64(len(ids)).tobytes())
+            f.write(table.tobytes())
+            for record in records:
+                f.write(record)
+    replace_file(chunks_path, write)
+    logging.info(f"Saved {len(ids)} chunks to {chunks_path}")
+
+class ChunkStore:
+    """
+    Read-only view of a chunk file through mmap. The table and the text
+    stay in the page cache, shared by every process that opens the same
+    file, and only the records a search returns are decoded.
+    """
 
-def build_from_texts(texts, model_name=EMBEDDING_MODEL, index_path=INDEX_FILE, chunks_path=CHUNKS_FILE):
-    all_chunks = []
-    metadata = []
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:8] != CHUNK_STORE_MAGIC:
+            raise ValueError(f"{path} is not a chunk store; rebuild the knowledge base")
+        count = int(np.frombuffer(self.data, dtype="<u8", count=1, offset=8)[0])
+        self.table = np.frombuffer(self.data, dtype=CHUNK_TABLE_DTYPE, count=count, offset=16)
+        self.blob_start = 16 + count * CHUNK_TABLE_DTYPE.itemsize
+
+    def get(self, chunk_id):
+        pos = int(np.searchsorted(self.table["id"], chunk_id))
+        if pos >= len(self.table) or self.table["id"][pos] != chunk_id:
+            return None
+        start = self.blob_start + int(self.table["offset"][pos])
+        chunk, meta = json.loads(self.data[start:start + int(self.table["length"][pos])].decode("utf-8"))
+        return chunk, meta
+
+    def __len__(self):
+        return len(self.table)
+
+def build_from_texts(texts, model_name=EMBEDDING_MODEL, index_path=INDEX_FILE, chunks_path=CHUNKS_FILE,
+                     embeddings_path=EMBEDDINGS_FILE):
+    """
+    Incremental build: `texts` is the whole corpus, but only chunks whose
+    (source, text) hash is not already in the embedding cache are
+    embedded, and the existing index is patched rather than rebuilt.
+    Everything is written via temp file + rename, index last, so a
+    running KnowledgeBase can pick up the new files at any moment.
+    """
+    entries = {}
     for doc in texts:
         source = doc.get("source", "unknown")
         src_tags = doc.get("tags", [])
         doc_text = doc.get("text", "")
         chunks = chunk_text(doc_text)
         for i, c in enumerate(chunks):
-            all_chunks.append(c)
-            metadata.append({"source": source, "tags": src_tags, "chunk_id": f"{source}::{i}"})
-    embeddings, model = embed_chunks(all_chunks, model_name)
-    faiss.normalize_L2(embeddings)
-    index = create_faiss_index(embeddings, index_path)
-    save_chunks(list(zip(all_chunks, metadata)), chunks_path)
-    return index, all_chunks, metadata
+            meta = {"source": source, "tags": src_tags, "chunk_id": f"{source}::{i}"}
+            if doc.get("url"):
+                meta["url"] = doc["url"]
+            entries[chunk_id(source, c)] = (c, meta)
+
+    cached = load_embedding_store(embeddings_path, model_name)
+    store = {cid: cached[cid] for cid in entries if cid in cached}
+    new_ids = [cid for cid in entries if cid not in store]
+    if new_ids:
+        embeddings, model = embed_chunks([entries[cid][0] for cid in new_ids], model_name)
+        faiss.normalize_L2(embeddings)
+        store.update(zip(new_ids, embeddings.astype('float32')))
+    logging.info(f"{len(entries)} chunks: {len(new_ids)} embedded, {len(store) - len(new_ids)} reused")
+
+    index, spec = sync_index(store, index_path)
+    save_embedding_store(store, embeddings_path, model_name)
+    save_chunks(entries, chunks_path)
+    write_index(index, spec, index_path)
+    return index, [c for c, _ in entries.values()], [m for _, m in entries.values()]
 
 def load_index(index_path=INDEX_FILE, chunks_path=CHUNKS_FILE):
     if not os.path.exists(index_path) or not os.path.exists(chunks_path):
         raise FileNotFoundError("Index or chunks file not found. Run build step first.")
-    index = faiss.read_index(index_path)
-    with open(chunks_path, "rb") as f:
-        chunks_meta = pickle.load(f)
-    return index, chunks_meta
+    # IO_FLAG_MMAP_IFC (newer FAISS) extends mmap to flat vector storage.
+    flags = (faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)) if INDEX_MMAP else 0
+    index = faiss.read_index(index_path, flags)
+    if os.path.exists(spec_path(index_path)):
+        with open(spec_path(index_path)) as f:
+            apply_search_params(index, json.load(f))
+    return index, ChunkStore(chunks_path)
+
+def collect_results(chunks_meta, distances, indices):
+    """
+    `chunks_meta` maps chunk id -> (chunk, meta): a ChunkStore, or a dict.
+    """
+    results = []
+    for score, idx in zip(distances, indices):
+        entry = chunks_meta.get(int(idx)) if idx >= 0 else None
+        if entry is not None:
+            chunk, meta = entry
+            results.append({"chunk": chunk, "meta": meta, "score": float(score)})
+    return results
 
 def query(index, chunks_meta, query_text, model_name=EMBEDDING_MODEL, k=4):
-    model = SentenceTransformer(model_name)
-    q_emb = model.encode([query_text], convert_to_numpy=True)
+    q_emb = load_model(model_name).encode([query_text], convert_to_numpy=True)
     faiss.normalize_L2(q_emb)
     distances, indices = index.search(q_emb.astype('float32'), k)
-    results = []
-    for idx in indices[0]:
-        if idx < len(chunks_meta):
-            chunk, meta = chunks_meta[idx]
-            results.append({"chunk": chunk, "meta": meta})
-    return results
+    return collect_results(chunks_meta, distances[0], indices[0])
+
+class KnowledgeBase:
+    """
+    Long-lived owner of the embedding model, the FAISS index and the chunk
+    list, so a question costs one encode (or a cache hit) and one search.
+    Call warm_up() at service start to pay the loading cost up front. A
+    rebuilt index on disk is picked up (checked every RELOAD_SECONDS) and
+    swapped in without interrupting queries.
+    """
+
+    def __init__(self, model_name=EMBEDDING_MODEL, index_path=INDEX_FILE, chunks_path=CHUNKS_FILE,
+                 cache_size=QUERY_CACHE_SIZE):
+        self.model_name = model_name
+        self.index_path = index_path
+        self.chunks_path = chunks_path
+        self.cache_size = cache_size
+        self.model = None
+        self.current = None
+        self.index_mtime = None
+        self.checked_at = 0
+        self.reload_lock = threading.Lock()
+        self.query_cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        if self.model is None:
+            self.model = load_model(self.model_name)
+        if self.current is None:
+            self.reload()
+
+    def reload(self):
+        mtime = os.stat(self.index_path).st_mtime_ns
+        index, chunks_meta = load_index(self.index_path, self.chunks_path)
+        self.current = (index, chunks_meta)
+        self.index_mtime = mtime
+
+    def maybe_reload(self):
+        if time.monotonic() - self.checked_at < RELOAD_SECONDS:
+            return
+        if not self.reload_lock.acquire(blocking=False):
+            return
+        try:
+            self.checked_at = time.monotonic()
+            if os.stat(self.index_path).st_mtime_ns != self.index_mtime:
+                self.reload()
+                logging.info(f"Reloaded knowledge base from {self.index_path}")
+        except (OSError, RuntimeError) as e:
+            logging.warning(f"Keeping the loaded knowledge base: {e}")
+        finally:
+            self.reload_lock.release()
+
+    def warm_up(self):
+        self.load()
+        self.encode(["warm up"], use_cache=False)
+
+    def encode(self, texts, batch_size=ENCODE_BATCH_SIZE, use_cache=True):
+        """
+        Returns unit-length float32 embeddings for `texts`; only texts not
+        in the query cache go through the model, in batches of `batch_size`.
+        """
+        if self.model is None:
+            self.load()
+        vectors = [None] * len(texts)
+        missing = []
+        with self.lock:
+            for i, text in enumerate(texts):
+                cached = self.query_cache.get(text) if use_cache else None
+                if cached is not None:
+                    self.query_cache.move_to_end(text)
+                    vectors[i] = cached
+                    self.hits += 1
+                else:
+                    missing.append(i)
+                    if use_cache:
+                        self.misses += 1
+
+        if missing:
+            encoded = self.model.encode([texts[i] for i in missing], batch_size=batch_size, convert_to_numpy=True)
+            encoded = encoded.astype('float32')
+            faiss.normalize_L2(encoded)
+            with self.lock:
+                for i, vector in zip(missing, encoded):
+                    vectors[i] = vector
+                    if use_cache and self.cache_size:
+                        self.query_cache[texts[i]] = vector
+                        self.query_cache.move_to_end(texts[i])
+                while len(self.query_cache) > self.cache_size:
+                    self.query_cache.popitem(last=False)
+        return np.vstack(vectors)
+
+    def search(self, texts, k=4):
+        """
+        Batched query: one encode and one index search for all `texts`.
+        """
+        if self.current is None:
+            self.load()
+        self.maybe_reload()
+        index, chunks_meta = self.current
+        distances, indices = index.search(self.encode(texts), k)
+        return [collect_results(chunks_meta, d, i) for d, i in zip(distances, indices)]
+
+    def query(self, query_text, k=4):
+        return self.search([query_text], k)[0]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "chunks": len(self.current[1]) if self.current else 0,
+            "cached_queries": len(self.query_cache),
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+        }
 
 if __name__ == "__main__":
-    urls = [
-        "https://www.who.int/news-room/fact-sheets/detail/depression"
+    sources = [
+        {"url": "https://www.who.int/news-room/fact-sheets/detail/depression",
+         "source": "who_depression_0", "tags": ["who", "depression"]},
     ]
-    docs = []
-    for i, u in enumerate(urls):
-        txt = scrape_article(u)
-        if txt:
-            docs.append({"source": f"who_depression_{i}", "text": txt, "tags": ["who", "depression"]})
-    if docs:
-        build_from_texts(docs)
+    try:
+        build_from_texts(iter_crawl(sources))
         print("KB built successfully.")
-    else:
+    except IncompleteCrawl as e:
+        print(f"{e}; knowledge base left unchanged.")
+    except ValueError:
         print("No documents to build from.")
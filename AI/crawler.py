@@ -0,0 +1,335 @@
+"""
+Async, polite crawler for knowledge-base ingestion. Each host's
+robots.txt is honoured (Disallow rules and Crawl-delay), requests to the
+same host are capped (CRAWL_PER_HOST at a time, CRAWL_DELAY seconds
+apart), responses are kept in an on-disk cache and revalidated with
+If-None-Match / If-Modified-Since, and documents are handed on as soon
+as each page is parsed.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import httpx
+from bs4 import BeautifulSoup
+
+
+CRAWL_CACHE_DIR = os.environ.get("CRAWL_CACHE_DIR", "crawl_cache")
+CRAWL_PER_HOST = int(os.environ.get("CRAWL_PER_HOST", "2"))
+CRAWL_MAX_CONCURRENCY = int(os.environ.get("CRAWL_MAX_CONCURRENCY", "16"))
+CRAWL_DELAY = float(os.environ.get("CRAWL_DELAY", "0.5"))
+CRAWL_TIMEOUT = float(os.environ.get("CRAWL_TIMEOUT", "12"))
+# "lxml" falls back to the pure-Python parser when lxml is not installed.
+CRAWL_PARSER = os.environ.get("CRAWL_PARSER", "lxml")
+CRAWL_USER_AGENT = os.environ.get("CRAWL_USER_AGENT", "ProjectManasBot/1.0 (knowledge base ingestion)")
+CRAWL_ROBOTS = os.environ.get("CRAWL_ROBOTS", "1") == "1"
+
+# robots.txt could not be fetched (transport error, 429 or 5xx): treat the host as unavailable.
+ROBOTS_UNREACHABLE = object()
+
+
+def pick_parser(name=CRAWL_PARSER):
+    if name == "lxml":
+        try:
+            import lxml  # noqa: F401
+        except ImportError:
+            logging.info("lxml is not installed; using html.parser")
+            return "html.parser"
+    return name
+
+
+def extract_text(html, parser="html.parser"):
+    soup = BeautifulSoup(html, parser)
+    article = soup.find("article")
+    if article:
+        paragraphs = article.find_all("p")
+    else:
+        paragraphs = soup.find_all("p")
+    return " ".join([p.get_text(" ", strip=True) for p in paragraphs])
+
+
+def robots_crawl_delay(text, user_agent=CRAWL_USER_AGENT):
+    """
+    Crawl-delay in seconds from robots.txt `text` (RobotFileParser only
+    accepts whole numbers). A group naming this agent wins over "*";
+    None when neither sets one.
+    """
+    name = user_agent.split("/")[0].lower()
+    delays = {}
+    agents, in_rules = [], False
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if ":" not in line:
+            continue
+        field, value = (part.strip() for part in line.split(":", 1))
+        field = field.lower()
+        if field == "user-agent":
+            if in_rules:
+                agents, in_rules = [], False
+            agents.append(value.lower())
+            continue
+        in_rules = True
+        if field == "crawl-delay":
+            try:
+                delay = float(value)
+            except ValueError:
+                continue
+            for agent in agents:
+                delays.setdefault(agent, delay)
+
+    for agent, delay in delays.items():
+        if agent != "*" and agent in name:
+            return delay
+    return delays.get("*")
+
+
+class HttpCache:
+    """
+    One metadata file (validators) and one body file per URL. Both are
+    written via temp file + rename, so an interrupted crawl leaves either
+    the previous entry or the new one.
+    """
+
+    def __init__(self, directory=CRAWL_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def paths(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.json"), os.path.join(self.directory, f"{key}.html")
+
+    def load(self, url):
+        meta_path, body_path = self.paths(url)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, encoding="utf-8") as f:
+                return meta, f.read()
+        except (OSError, ValueError):
+            return None, None
+
+    def save(self, url, response):
+        meta_path, body_path = self.paths(url)
+        meta = {
+            "url": url,
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "fetched_at": time.time(),
+        }
+        for path, content in ((body_path, response.text), (meta_path, json.dumps(meta))):
+            tmp_path = f"{path}.tmp-{os.getpid()}"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+    @staticmethod
+    def conditional_headers(meta):
+        headers = {}
+        if meta and meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta and meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+
+def as_target(target):
+    if isinstance(target, str):
+        return {"url": target, "source": target, "tags": []}
+    return {"source": target["url"], "tags": [], **target}
+
+
+class Crawler:
+
+    def __init__(self, cache_dir=CRAWL_CACHE_DIR, per_host=CRAWL_PER_HOST, max_concurrency=CRAWL_MAX_CONCURRENCY,
+                 delay=CRAWL_DELAY, parser=CRAWL_PARSER, timeout=CRAWL_TIMEOUT, robots=CRAWL_ROBOTS):
+        self.cache = HttpCache(cache_dir)
+        self.per_host = per_host
+        self.max_concurrency = max_concurrency
+        self.delay = delay
+        self.parser = pick_parser(parser)
+        self.timeout = timeout
+        self.respect_robots = robots
+        self.robots = {}
+        self.host_delay = {}
+        self.host_slots = {}
+        self.next_start = {}
+        self.slots = None
+        self.stats = Counter()
+        self.failed = []
+
+    async def wait_turn(self, host):
+        # Spaces request starts to the same host at least `delay` (or the
+        # host's Crawl-delay, if longer) apart.
+        now = time.monotonic()
+        start = max(now, self.next_start.get(host, 0))
+        self.next_start[host] = start + self.host_delay.get(host, self.delay)
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def get(self, client, url, headers=None):
+        host = urlsplit(url).netloc
+        host_slots = self.host_slots.setdefault(host, asyncio.Semaphore(self.per_host))
+        # Wait for the host first, so that tasks queued behind a slow host
+        # do not hold global slots other hosts could be using.
+        async with host_slots:
+            await self.wait_turn(host)
+            async with self.slots:
+                return await client.get(url, headers=headers)
+
+    async def load_robots(self, client, scheme, host):
+        """
+        Returns the host's parsed robots.txt, None when it has none (any
+        4xx) or ROBOTS_UNREACHABLE.
+        """
+        try:
+            r = await self.get(client, f"{scheme}://{host}/robots.txt")
+        except httpx.HTTPError as e:
+            logging.warning(f"Failed to fetch robots.txt for {host}: {e}")
+            return ROBOTS_UNREACHABLE
+        if r.status_code == 429 or r.status_code >= 500:
+            logging.warning(f"Failed to fetch robots.txt for {host}: HTTP {r.status_code}")
+            return ROBOTS_UNREACHABLE
+        if r.status_code >= 400:
+            return None
+        rules = RobotFileParser()
+        rules.parse(r.text.splitlines())
+        crawl_delay = robots_crawl_delay(r.text)
+        if crawl_delay and crawl_delay > self.delay:
+            self.host_delay[host] = crawl_delay
+        return rules
+
+    async def robots_for(self, client, url):
+        parts = urlsplit(url)
+        if parts.netloc not in self.robots:
+            # Shared, so that concurrent first requests to a host fetch robots.txt once.
+            self.robots[parts.netloc] = asyncio.ensure_future(self.load_robots(client, parts.scheme, parts.netloc))
+        return await self.robots[parts.netloc]
+
+    async def fetch(self, client, url):
+        """
+        Returns the page body, from the network or, when the server says
+        it has not changed or is unavailable (transport error, 429, 5xx,
+        or robots.txt unreachable), from the cache. Unavailable pages with
+        nothing cached are recorded in `failed`; pages the server reports
+        gone (other 4xx) or robots.txt disallows are not.
+        """
+        meta, cached_body = self.cache.load(url)
+        if self.respect_robots:
+            rules = await self.robots_for(client, url)
+            if rules is ROBOTS_UNREACHABLE:
+                return self.unavailable(url, cached_body)
+            if rules is not None and not rules.can_fetch(CRAWL_USER_AGENT, url):
+                logging.info(f"Skipping {url}: disallowed by robots.txt")
+                self.stats["disallowed"] += 1
+                return None
+
+        try:
+            r = await self.get(client, url, HttpCache.conditional_headers(meta if cached_body is not None else None))
+        except httpx.HTTPError as e:
+            logging.warning(f"Failed to fetch {url}: {e}")
+            return self.unavailable(url, cached_body)
+
+        if r.status_code == 304 and cached_body is not None:
+            self.stats["not_modified"] += 1
+            return cached_body
+        if r.status_code == 429 or r.status_code >= 500:
+            logging.warning(f"Failed to fetch {url}: HTTP {r.status_code}")
+            return self.unavailable(url, cached_body)
+        if r.status_code >= 400:
+            logging.warning(f"Failed to fetch {url}: HTTP {r.status_code}")
+            self.stats["gone"] += 1
+            return None
+        self.cache.save(url, r)
+        self.stats["fetched"] += 1
+        return r.text
+
+    def unavailable(self, url, cached_body):
+        self.stats["errors"] += 1
+        if cached_body is None:
+            self.failed.append(url)
+        else:
+            self.stats["stale"] += 1
+        return cached_body
+
+    async def fetch_doc(self, client, target):
+        body = await self.fetch(client, target["url"])
+        if not body:
+            return None
+        text = await asyncio.to_thread(extract_text, body, self.parser)
+        if not text:
+            return None
+        return {"source": target["source"], "text": text, "tags": target["tags"], "url": target["url"]}
+
+    async def crawl(self, targets):
+        """
+        Async generator of {"source", "text", "tags", "url"} documents in
+        completion order. Targets are URLs or dicts with "url" and
+        optionally "source" and "tags".
+        """
+        self.slots = asyncio.Semaphore(self.max_concurrency)
+        self.failed = []
+        self.robots = {}
+        limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits, follow_redirects=True,
+                                     headers={"User-Agent": CRAWL_USER_AGENT}) as client:
+            tasks = [asyncio.create_task(self.fetch_doc(client, as_target(t))) for t in targets]
+            for task in asyncio.as_completed(tasks):
+                doc = await task
+                if doc:
+                    yield doc
+        logging.info(f"Crawl finished: {dict(self.stats)}")
+
+
+class IncompleteCrawl(RuntimeError):
+    pass
+
+
+def iter_crawl(targets, crawler=None, allow_partial=False):
+    """
+    Runs the crawl on its own event loop in a background thread and yields
+    documents as they arrive, so a synchronous consumer such as
+    build_from_texts can chunk while pages are still being fetched.
+
+    build_from_texts treats what it is given as the whole corpus and drops
+    sources that are missing, so unless `allow_partial` is set this raises
+    IncompleteCrawl after the last document when the crawl aborted or a
+    source could not be fetched and had nothing cached.
+    """
+    crawler = crawler or Crawler()
+    docs = queue.Queue()
+    done = object()
+    errors = []
+
+    def run():
+        async def pump():
+            async for doc in crawler.crawl(targets):
+                docs.put(doc)
+        try:
+            asyncio.run(pump())
+        except Exception as e:
+            logging.warning(f"Crawl aborted: {e}")
+            errors.append(e)
+        finally:
+            docs.put(done)
+
+    threading.Thread(target=run, daemon=True).start()
+    while True:
+        doc = docs.get()
+        if doc is done:
+            break
+        yield doc
+
+    if allow_partial:
+        return
+    if errors:
+        raise IncompleteCrawl(f"Crawl aborted: {errors[0]}") from errors[0]
+    if crawler.failed:
+        raise IncompleteCrawl(f"{len(crawler.failed)} source(s) could not be fetched: {', '.join(crawler.failed[:5])}")
@@ -0,0 +1,187 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves are still atomic, just not serialized between workers
+    fcntl = None
+
+
+# 0 disables the cache.
+INFERENCE_CACHE_SIZE = int(os.environ.get("INFERENCE_CACHE_SIZE", "10000"))
+INFERENCE_CACHE_TTL = int(os.environ.get("INFERENCE_CACHE_TTL", "86400"))
+# JSON file shared by all workers: loaded at start, merged into on save().
+INFERENCE_CACHE_PATH = os.environ.get("INFERENCE_CACHE_PATH", "")
+# How often new results are saved in the background; 0 saves only when save() is called.
+INFERENCE_CACHE_SAVE_SECONDS = int(os.environ.get("INFERENCE_CACHE_SAVE_SECONDS", "300"))
+
+
+def normalize_text(text):
+    return " ".join(text.lower().split())
+
+
+def cache_key(task, version, text):
+    # Hashed so that neither memory dumps nor the persisted file hold user messages.
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{task}:{version}:{digest}"
+
+
+class InferenceCache:
+    """
+    Bounded LRU of classifier results with a TTL, keyed on the task, the
+    model version and a hash of the normalized message text. Expiry uses wall-clock
+    time so that entries persisted to disk stay valid across restarts.
+    """
+
+    def __init__(self, max_entries=INFERENCE_CACHE_SIZE, ttl=INFERENCE_CACHE_TTL, path=INFERENCE_CACHE_PATH,
+                 save_interval=INFERENCE_CACHE_SAVE_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        if path and os.path.exists(path):
+            self.load()
+        if path and save_interval > 0:
+            threading.Thread(target=self.save_forever, args=(save_interval,), daemon=True).start()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.time():
+                self.entries.pop(key, None)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.time() + self.ttl, value)
+            self.entries.move_to_end(key)
+            self.dirty = True
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def batch(self, task, version, fn, texts, bypass=None):
+        """
+        Runs `fn` (list of texts -> list of results) only on the texts that
+        are not cached. Texts for which `bypass` is true are never read
+        from or written to the cache.
+        """
+        if self.max_entries <= 0:
+            return fn(texts)
+        results = [None] * len(texts)
+        misses = []
+        for i, text in enumerate(texts):
+            if bypass and bypass(text):
+                self.bypassed += 1
+                misses.append((i, None))
+                continue
+            key = cache_key(task, version, text)
+            results[i] = self.get(key)
+            if results[i] is None:
+                misses.append((i, key))
+
+        if misses:
+            computed = fn([texts[i] for i, _ in misses])
+            for (i, key), result in zip(misses, computed):
+                results[i] = result
+                if key is not None:
+                    self.put(key, result)
+        return results
+
+    def read_rows(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            logging.warning(f"Could not load inference cache from {self.path}: {e}")
+            return []
+
+    def merge(self, rows):
+        """
+        Adds unexpired [key, expires, value] rows this process does not
+        hold (or holds with an earlier expiry). New keys go in as least
+        recently used, so they never push out this process's own entries.
+        """
+        now = time.time()
+        with self.lock:
+            for key, expires, value in rows:
+                if expires <= now:
+                    continue
+                held = self.entries.get(key)
+                if held is None:
+                    self.entries[key] = (expires, value)
+                    self.entries.move_to_end(key, last=False)
+                elif held[0] < expires:
+                    self.entries[key] = (expires, value)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def load(self):
+        self.merge(self.read_rows())
+        logging.info(f"Loaded {len(self.entries)} cached inference results from {self.path}")
+
+    @contextlib.contextmanager
+    def file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(f"{self.path}.lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def save(self):
+        """
+        Merges what other workers have saved into this cache, then writes
+        the union via temp file + rename. The read-merge-write holds a lock
+        file, so concurrent saves from several workers lose nothing.
+        """
+        if not self.path:
+            return
+        with self.file_lock():
+            self.merge(self.read_rows())
+            now = time.time()
+            with self.lock:
+                rows = [[key, expires, value] for key, (expires, value) in self.entries.items() if expires > now]
+                self.dirty = False
+            tmp_path = f"{self.path}.tmp-{os.getpid()}"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(rows, f)
+            os.replace(tmp_path, self.path)
+
+    def save_forever(self, interval):
+        while True:
+            time.sleep(interval)
+            if self.dirty:
+                try:
+                    self.save()
+                except OSError as e:
+                    logging.warning(f"Could not save inference cache to {self.path}: {e}")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+        }
@@ -0,0 +1,134 @@
+"""
+Embedding-based intent classifier. Each label is represented by the
+centroid of its description and a handful of example utterances; those
+centroids are embedded once per (model, label set) and cached, so a
+message costs one sentence-embedding pass and a matrix product.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import numpy as np
+
+from model_registry import registry
+
+
+INTENT_EMBEDDING_MODEL = os.environ.get("INTENT_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+INTENT_CENTROID_CACHE = os.environ.get("INTENT_CENTROID_CACHE", "")
+
+INTENT_EXAMPLES = {
+    "greeting": [
+        "hi", "hello there", "hey, how are you", "good morning",
+    ],
+    "goodbye": [
+        "bye", "see you later", "I have to go now", "talk to you tomorrow",
+    ],
+    "smalltalk": [
+        "what's your name", "how is your day going", "do you like music", "tell me something fun",
+    ],
+    "ask-resource": [
+        "can you share some articles on stress", "where can I read about anxiety",
+        "are there any videos on meditation", "send me resources for sleep problems",
+    ],
+    "feel_anxious": [
+        "I'm so nervous about my exams", "my heart races and I can't stop worrying",
+        "I feel anxious all the time", "I panic before presentations",
+    ],
+    "feel_depressed": [
+        "I feel empty and hopeless", "nothing makes me happy anymore",
+        "I've been really sad for weeks", "I don't want to get out of bed",
+    ],
+    "seek_coping": [
+        "how can I calm down", "what can I do to handle stress",
+        "give me a breathing exercise", "how do I cope with loneliness",
+    ],
+    "ask_for_professional_help": [
+        "I want to talk to a therapist", "how do I find a counsellor",
+        "can I book a session with a mentor", "I think I need professional help",
+    ],
+    "self_harm_ideation": [
+        "I want to hurt myself", "I don't want to live anymore",
+        "I keep thinking about ending it", "everyone would be better off without me",
+    ],
+    "gratitude": [
+        "thank you so much", "thanks, that helped", "I appreciate your help", "you've been really kind",
+    ],
+    "neutral": [
+        "okay", "I see", "hmm", "not sure",
+    ],
+}
+
+_centroids = {}
+_lock = threading.Lock()
+
+
+def get_encoder(model=INTENT_EMBEDDING_MODEL):
+    return registry.get("sentence-embedding", model)
+
+
+def encode(texts, model=INTENT_EMBEDDING_MODEL):
+    vectors = get_encoder(model).encode(list(texts), convert_to_numpy=True, normalize_embeddings=True)
+    return vectors.astype(np.float32)
+
+
+def label_texts(label, examples=INTENT_EXAMPLES):
+    return [label.replace("_", " ").replace("-", " ")] + examples.get(label, [])
+
+
+def cache_key(candidates, model):
+    payload = json.dumps([model, [label_texts(c) for c in candidates]])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def build_centroids(candidates, model):
+    centroids = []
+    for label in candidates:
+        vectors = encode(label_texts(label), model)
+        centroid = vectors.mean(axis=0)
+        centroids.append(centroid / np.linalg.norm(centroid))
+    return np.vstack(centroids).astype(np.float32)
+
+
+def get_centroids(candidates, model=INTENT_EMBEDDING_MODEL):
+    """
+    Returns a (len(candidates), dim) matrix of unit-length label centroids,
+    built on first use and kept in memory (and on disk when
+    INTENT_CENTROID_CACHE points to a directory).
+    """
+    key = cache_key(candidates, model)
+    centroids = _centroids.get(key)
+    if centroids is not None:
+        return centroids
+
+    with _lock:
+        centroids = _centroids.get(key)
+        if centroids is not None:
+            return centroids
+
+        path = os.path.join(INTENT_CENTROID_CACHE, f"intent_centroids_{key}.npy") if INTENT_CENTROID_CACHE else None
+        if path and os.path.exists(path):
+            centroids = np.load(path)
+        else:
+            centroids = build_centroids(candidates, model)
+            if path:
+                os.makedirs(INTENT_CENTROID_CACHE, exist_ok=True)
+                np.save(path, centroids)
+                logging.info(f"Cached intent centroids at {path}")
+        _centroids[key] = centroids
+        return centroids
+
+
+def classify_batch(texts, candidates, model=INTENT_EMBEDDING_MODEL):
+    """
+    Same result shape as Intent_Detection.detect_intent; scores are cosine
+    similarities to each label centroid.
+    """
+    candidates = list(candidates)
+    scores = encode(texts, model) @ get_centroids(candidates, model).T
+    results = []
+    for row in scores:
+        order = np.argsort(-row)
+        ranked = [(candidates[i], float(row[i])) for i in order]
+        results.append({"label": ranked[0][0], "score": ranked[0][1], "all": ranked})
+    return results
@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import Intent_Detection as intents
+
+
+MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH", "16"))
+MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "10"))
+
+
+class MicroBatcher:
+    """
+    Collects concurrent single-item requests for up to `max_wait_ms` (or
+    until `max_batch_size` are waiting) and runs them through `fn` as one
+    batch in the executor. `fn` maps a list of inputs to a list of outputs
+    in the same order; each caller gets its own result back.
+    """
+
+    def __init__(self, fn, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS, executor=None):
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor
+        self.queue = None
+        self.worker = None
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item):
+        if self.worker is None:
+            self.queue = asyncio.Queue()
+            self.worker = asyncio.create_task(self.run())
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, future))
+        return await future
+
+    async def collect(self):
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self.collect()
+            batch = [(item, future) for item, future in batch if not future.cancelled()]
+            if not batch:
+                continue
+            try:
+                results = await loop.run_in_executor(self.executor, self.fn, [item for item, _ in batch])
+            except Exception as e:
+                logging.warning(f"Batched inference failed for {len(batch)} request(s): {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def close(self):
+        if self.worker:
+            self.worker.cancel()
+            self.worker = None
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0,
+        }
+
+
+class InferenceBatchers:
+    """
+    Async front-end for Intent_Detection. All three classifiers share a
+    single inference thread so that batches do not compete for cores.
+    """
+
+    def __init__(self, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self.intent = MicroBatcher(intents.detect_intent_batch, max_batch_size, max_wait_ms, executor)
+        self.emotion = MicroBatcher(intents.detect_emotion_batch, max_batch_size, max_wait_ms, executor)
+        self.safety = MicroBatcher(intents.safety_check_batch, max_batch_size, max_wait_ms, executor)
+        self.executor = executor
+
+    async def detect_intent(self, text):
+        return await self.intent.submit(text)
+
+    async def detect_emotion(self, text):
+        return await self.emotion.submit(text)
+
+    async def safety_check(self, text):
+        return await self.safety.submit(text)
+
+    async def close(self):
+        for batcher in (self.intent, self.emotion, self.safety):
+            await batcher.close()
+        self.executor.shutdown(wait=False)
+
+    def stats(self):
+        return {"intent": self.intent.stats(), "emotion": self.emotion.stats(), "safety": self.safety.stats()}
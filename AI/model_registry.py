@@ -0,0 +1,114 @@
+import logging
+import os
+import threading
+import time
+from transformers import pipeline
+
+
+def rss_bytes():
+    """
+    Current resident set size, or None where it cannot be read. Without
+    psutil this reads /proc; ru_maxrss is no substitute, being the peak.
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def megabytes(n):
+    return round(n / 2**20, 1) if n is not None else "unavailable"
+
+
+def rss_delta(before, after):
+    return megabytes(after - before) if before is not None and after is not None else "unavailable"
+
+
+def parameter_bytes(pipe):
+    model = getattr(pipe, "model", pipe)
+    if not hasattr(model, "parameters"):
+        return 0
+    return sum(p.numel() * p.element_size() for p in model.parameters())
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of HuggingFace pipelines. Each (task, model, backend)
+    is loaded at most once, on first use or on an explicit warm-up, and
+    every caller asking for the same key shares the same instance.
+    """
+
+    def __init__(self):
+        self.pipelines = {}
+        self.stats = {}
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def get(self, task, model, backend="torch"):
+        key = (task, model, backend)
+        pipe = self.pipelines.get(key)
+        if pipe is not None:
+            return pipe
+
+        with self.lock:
+            key_lock = self.locks.setdefault(key, threading.Lock())
+        with key_lock:
+            pipe = self.pipelines.get(key)
+            if pipe is None:
+                pipe = self.load(task, model, backend)
+                self.pipelines[key] = pipe
+        return pipe
+
+    def load(self, task, model, backend="torch"):
+        rss_before = rss_bytes()
+        start = time.perf_counter()
+        pipe, loaded_backend = None, backend
+        if backend == "onnx":
+            try:
+                import onnx_backend
+                pipe = onnx_backend.load_pipeline(task, model)
+                weight_bytes = onnx_backend.model_bytes(model)
+            except ImportError as e:
+                # optimum and onnxruntime are optional; serve the same model with PyTorch.
+                logging.warning(f"ONNX backend unavailable ({e}); loading {model} with PyTorch")
+                loaded_backend = "torch"
+
+        if pipe is None:
+            if task == "sentence-embedding":
+                from sentence_transformers import SentenceTransformer
+                pipe = SentenceTransformer(model)
+            else:
+                pipe = pipeline(task, model=model)
+            weight_bytes = parameter_bytes(pipe)
+        seconds = time.perf_counter() - start
+
+        self.stats[(task, model, backend)] = {
+            "task": task,
+            "model": model,
+            "backend": loaded_backend,
+            "requested_backend": backend,
+            "load_seconds": round(seconds, 2),
+            "parameter_mb": round(weight_bytes / 2**20, 1),
+            "rss_delta_mb": rss_delta(rss_before, rss_bytes()),
+        }
+        logging.info(f"Loaded {model} for {task} ({loaded_backend}) in {seconds:.1f}s")
+        return pipe
+
+    def warm_up(self, specs):
+        for spec in specs:
+            self.get(*spec)
+
+    def report(self):
+        return {
+            "loaded": list(self.stats.values()),
+            "rss_mb": megabytes(rss_bytes()),
+        }
+
+
+registry = ModelRegistry()
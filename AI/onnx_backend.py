@@ -0,0 +1,74 @@
+"""
+ONNX Runtime backend for the sequence-classification pipelines. A model
+is exported once to ONNX_CACHE_DIR, optionally quantized to dynamic int8,
+and wrapped in the usual transformers pipeline so callers see the same
+outputs as with PyTorch. Needs `optimum[onnxruntime]`; without it the
+model registry loads the PyTorch pipeline instead.
+"""
+import logging
+import os
+import shutil
+
+from transformers import AutoTokenizer, pipeline
+
+
+ONNX_CACHE_DIR = os.environ.get("ONNX_CACHE_DIR", "onnx_models")
+ONNX_QUANTIZE = os.environ.get("ONNX_QUANTIZE", "1") == "1"
+# Instruction set the int8 kernels are tuned for: avx2, avx512, avx512_vnni or arm64.
+ONNX_QUANT_TARGET = os.environ.get("ONNX_QUANT_TARGET", "avx2")
+ONNX_THREADS = int(os.environ.get("ONNX_THREADS", "0"))  # 0 lets ORT decide
+
+
+def export_dir(model):
+    return os.path.join(ONNX_CACHE_DIR, model.replace("/", "__"))
+
+
+def export(model, quantize=ONNX_QUANTIZE):
+    """
+    Exports `model` (and its int8 variant) unless already on disk and
+    returns (directory, onnx file name). The export is written to a
+    scratch directory and renamed into place so that a crashed or
+    concurrent export never leaves a half-written model behind.
+    """
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    path = export_dir(model)
+    if not os.path.exists(os.path.join(path, "model.onnx")):
+        logging.info(f"Exporting {model} to ONNX in {path}")
+        scratch = f"{path}.tmp-{os.getpid()}"
+        ORTModelForSequenceClassification.from_pretrained(model, export=True).save_pretrained(scratch)
+        AutoTokenizer.from_pretrained(model).save_pretrained(scratch)
+        try:
+            os.rename(scratch, path)
+        except OSError:
+            shutil.rmtree(scratch, ignore_errors=True)  # another worker got there first
+
+    if not quantize:
+        return path, "model.onnx"
+
+    if not os.path.exists(os.path.join(path, "model_quantized.onnx")):
+        logging.info(f"Quantizing {model} to int8 for {ONNX_QUANT_TARGET}")
+        config = getattr(AutoQuantizationConfig, ONNX_QUANT_TARGET)(is_static=False, per_channel=False)
+        scratch = f"{path}.quant-{os.getpid()}"
+        ORTQuantizer.from_pretrained(path, file_name="model.onnx").quantize(save_dir=scratch, quantization_config=config)
+        os.replace(os.path.join(scratch, "model_quantized.onnx"), os.path.join(path, "model_quantized.onnx"))
+        shutil.rmtree(scratch, ignore_errors=True)
+    return path, "model_quantized.onnx"
+
+
+def load_pipeline(task, model, quantize=ONNX_QUANTIZE):
+    import onnxruntime
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+
+    path, file_name = export(model, quantize)
+    options = onnxruntime.SessionOptions()
+    if ONNX_THREADS:
+        options.intra_op_num_threads = ONNX_THREADS
+    ort_model = ORTModelForSequenceClassification.from_pretrained(path, file_name=file_name, session_options=options)
+    return pipeline(task, model=ort_model, tokenizer=AutoTokenizer.from_pretrained(path))
+
+
+def model_bytes(model, quantize=ONNX_QUANTIZE):
+    path = os.path.join(export_dir(model), "model_quantized.onnx" if quantize else "model.onnx")
+    return os.path.getsize(path) if os.path.exists(path) else 0
@@ -17,6 +17,7 @@ document.addEventListener("DOMContentLoaded", function() {
 function logoutUser() {
     localStorage.removeItem("username");
     localStorage.removeItem("userType");
+    localStorage.removeItem("sessionToken");
     
     alert("You have been logged out.");
     window.location.href = "index.html";
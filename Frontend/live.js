@@ -0,0 +1,19 @@
+function subscribeLive(path, onEvent) {
+    const state = { open: false };
+
+    function connect() {
+        const proto = window.location.protocol === "https:" ? "wss" : "ws";
+        const token = encodeURIComponent(localStorage.getItem("sessionToken") || "");
+        const ws = new WebSocket(`${proto}://${window.location.host}${path}?token=${token}`);
+
+        ws.onopen = () => { state.open = true; };
+        ws.onmessage = (e) => onEvent(JSON.parse(e.data));
+        ws.onclose = () => {
+            state.open = false;
+            setTimeout(connect, 3000);
+        };
+    }
+
+    connect();
+    return state;
+}
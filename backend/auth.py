@@ -0,0 +1,135 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import Header, HTTPException
+from passlib.hash import bcrypt
+
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+AUTH_WORKERS = int(os.getenv("AUTH_WORKERS", str(os.cpu_count() or 2)))
+AUTH_MAX_PENDING = int(os.getenv("AUTH_MAX_PENDING", str(AUTH_WORKERS * 8)))
+SESSION_TTL = int(os.getenv("SESSION_TTL_SECONDS", str(7 * 24 * 3600)))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+
+SESSION_SECRET = os.getenv("SESSION_SECRET")
+if not SESSION_SECRET:
+    logging.warning("SESSION_SECRET not set; session tokens will not survive restarts or be shared across workers.")
+    SESSION_SECRET = secrets.token_hex(32)
+
+pool = None
+pending = None
+verified_sessions = OrderedDict()
+
+
+def hash_in_worker(password, rounds):
+    return bcrypt.using(rounds=rounds).hash(password)
+
+
+def verify_in_worker(password, hashed):
+    return bcrypt.verify(password, hashed)
+
+
+def start_pool():
+    global pool, pending
+    pool = ProcessPoolExecutor(max_workers=AUTH_WORKERS)
+    pending = asyncio.Semaphore(AUTH_MAX_PENDING)
+
+
+def stop_pool():
+    if pool:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_in_pool(fn, *args):
+    """
+    bcrypt is pure CPU work, so it runs in worker processes rather than in
+    the event loop or the GIL-bound threadpool. Callers beyond the pending
+    limit are turned away instead of queueing without bound.
+    """
+    if pending.locked():
+        raise HTTPException(503, "Authentication is busy, please retry shortly.")
+    async with pending:
+        return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+
+
+async def hash_password(password):
+    return await run_in_pool(hash_in_worker, password, BCRYPT_ROUNDS)
+
+
+async def verify_password(password, hashed):
+    return await run_in_pool(verify_in_worker, password, hashed)
+
+
+def b64encode(raw):
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def b64decode(data):
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def sign(payload):
+    return hmac.new(SESSION_SECRET.encode("utf-8"), payload.encode("ascii"), hashlib.sha256).digest()
+
+
+def issue_session_token(subject, user_type):
+    body = json.dumps({"sub": subject, "type": user_type, "exp": int(time.time()) + SESSION_TTL}, separators=(",", ":"))
+    payload = b64encode(body.encode("utf-8"))
+    return f"{payload}.{b64encode(sign(payload))}"
+
+
+def verify_session_token(token):
+    """
+    Returns the session claims for a valid, unexpired token, else None.
+    Tokens already verified are served from a bounded LRU so repeat
+    requests skip the HMAC and JSON work entirely.
+    """
+    now = time.time()
+    claims = verified_sessions.get(token)
+    if claims is not None:
+        if claims["exp"] > now:
+            verified_sessions.move_to_end(token)
+            return claims
+        del verified_sessions[token]
+        return None
+
+    try:
+        payload, signature = token.split(".", 1)
+        if not hmac.compare_digest(sign(payload), b64decode(signature)):
+            return None
+        claims = json.loads(b64decode(payload))
+    except ValueError:
+        return None
+    if claims.get("exp", 0) <= now:
+        return None
+
+    verified_sessions[token] = claims
+    if len(verified_sessions) > SESSION_CACHE_SIZE:
+        verified_sessions.popitem(last=False)
+    return claims
+
+
+def require_session(authorization: str = Header(None)):
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(401, "Missing session token.")
+    claims = verify_session_token(authorization[len("Bearer "):])
+    if not claims:
+        raise HTTPException(401, "Invalid or expired session.")
+    return claims
+
+
+def require_user(session, *users):
+    """
+    Raises 403 unless the session belongs to one of `users`; used by
+    endpoints that take the acting user from the request.
+    """
+    if session["sub"] not in users:
+        raise HTTPException(403, "This session cannot act for that user.")
@@ -0,0 +1,103 @@
+"""
+Write-latency benchmark for /chat/send.
+
+Compares the old four-round-trip write path (find_one, insert_one,
+$push update, $inc update on an embedded messages array) with the
+current path (bucket append plus one atomic summary upsert) under
+concurrent senders. Runs against a scratch database that is dropped
+afterwards:
+
+    python bench_chat_send.py --senders 32 --messages 200 --chats 8
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from datetime import datetime, timezone
+
+from chat_store import append_message, upsert_chat_summary
+from database import create_client
+from indexes import ensure_indexes
+
+
+async def legacy_send(db, chat_id, sender, text, ts):
+    mentor_email, student_username = chat_id.split("__", 1)
+    chat = await db.legacy_chats.find_one({"chat_id": chat_id})
+    if not chat:
+        await db.legacy_chats.insert_one({
+            "chat_id": chat_id,
+            "mentor": mentor_email,
+            "student": student_username,
+            "messages": [],
+            "last_message": "",
+            "last_timestamp": ts,
+            "unread_for_student": 0,
+            "unread_for_mentor": 0
+        })
+
+    msg = {"sender": sender, "text": text, "timestamp": ts}
+    await db.legacy_chats.update_one(
+        {"chat_id": chat_id},
+        {"$push": {"messages": msg}, "$set": {"last_message": text, "last_timestamp": ts}}
+    )
+    field = "unread_for_student" if sender == mentor_email else "unread_for_mentor"
+    await db.legacy_chats.update_one({"chat_id": chat_id}, {"$inc": {field: 1}})
+
+
+async def atomic_send(db, chat_id, sender, text, ts):
+    mentor_email, student_username = chat_id.split("__", 1)
+    await append_message(db.chat_messages, chat_id, sender, text, ts)
+    field = "unread_for_student" if sender == mentor_email else "unread_for_mentor"
+    await upsert_chat_summary(db.chats, chat_id, mentor_email, student_username, field, text, ts)
+
+
+async def run(db, send, senders, messages, chats):
+    async def worker(n):
+        chat_id = f"mentor{n % chats}@example.com__student{n % chats}"
+        sender = f"student{n % chats}" if n % 2 else f"mentor{n % chats}@example.com"
+        latencies = []
+        for i in range(messages):
+            ts = datetime.now(timezone.utc).isoformat()
+            start = time.perf_counter()
+            await send(db, chat_id, sender, f"message {i} from worker {n}", ts)
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(worker(n) for n in range(senders)))
+    latencies = [lat for result in results for lat in result]
+    return latencies, time.perf_counter() - start
+
+
+def report(name, latencies, elapsed):
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    print(f"{name:>8}: {len(latencies) / elapsed:8.0f} msg/s  "
+          f"p50 {pct(0.50):6.2f} ms  p95 {pct(0.95):6.2f} ms  p99 {pct(0.99):6.2f} ms  "
+          f"mean {statistics.mean(latencies) * 1000:6.2f} ms")
+
+
+async def main(args):
+    client = create_client(args.uri)
+    db = client.manas_bench
+    await client.drop_database(db.name)
+    await db.legacy_chats.create_index("chat_id")
+    await ensure_indexes(db)
+
+    try:
+        report("legacy", *await run(db, legacy_send, args.senders, args.messages, args.chats))
+        report("atomic", *await run(db, atomic_send, args.senders, args.messages, args.chats))
+        dupes = await db.legacy_chats.count_documents({}) - len(await db.legacy_chats.distinct("chat_id"))
+        print(f"legacy duplicate chat docs: {dupes}")
+    finally:
+        await client.drop_database(db.name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uri", default=os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--senders", type=int, default=32)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--chats", type=int, default=8)
+    asyncio.run(main(parser.parse_args()))
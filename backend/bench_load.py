@@ -0,0 +1,105 @@
+"""
+HTTP load-test harness for the backend.
+
+Drives a mixed read/write workload (forum feed, chat send, chat delta
+poll, inbox list) against a running server at several concurrency levels
+and prints throughput and latency per level. To compare data layers, run
+it once against each server build, e.g. with a real mongod:
+
+    uvicorn server:app --port 8000
+    python bench_load.py --url http://127.0.0.1:8000 --concurrency 10 50 200
+
+or without one, using the in-memory stand-in (needs mongomock-motor):
+
+    MONGO_URI=mongomock:// uvicorn server:app --port 8000
+"""
+import argparse
+import asyncio
+import random
+import time
+import httpx
+
+
+PASSWORD = "load-test-password"
+
+
+async def log_in(client, username):
+    # Registering again fails harmlessly once the user exists.
+    await client.post("/register/anonymous", data={"username": username, "password": PASSWORD})
+    res = await client.post("/login/anonymous", data={"username": username, "password": PASSWORD})
+    res.raise_for_status()
+    return {"Authorization": f"Bearer {res.json()['token']}"}
+
+
+async def seed(client, chats):
+    """
+    Registers and logs in one simulated student per chat and returns
+    their auth headers, then sends each chat's first message and a few
+    forum posts.
+    """
+    auth = [await log_in(client, f"student{n}") for n in range(chats)]
+    for n in range(chats):
+        await client.post("/chat/send", headers=auth[n], data={
+            "chat_id": f"mentor{n}@example.com__student{n}", "sender": f"student{n}", "text": "hello"
+        })
+    for n in range(min(20, chats)):
+        await client.post("/forum/post", headers=auth[n], data={"username": f"student{n}", "message": f"seed post {n}"})
+    return auth
+
+
+async def one_request(client, auth):
+    n = random.randrange(len(auth))
+    chat_id = f"mentor{n}@example.com__student{n}"
+    roll = random.random()
+    if roll < 0.4:
+        return await client.get(f"/chat/{chat_id}/messages", headers=auth[n])
+    if roll < 0.6:
+        return await client.get("/forum/all")
+    if roll < 0.8:
+        return await client.get(f"/chat/student/student{n}", headers=auth[n])
+    return await client.post("/chat/send", headers=auth[n], data={"chat_id": chat_id, "sender": f"student{n}", "text": "ping"})
+
+
+async def run_level(client, concurrency, requests, auth):
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                res = await one_request(client, auth)
+                if res.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    print(f"c={concurrency:<4} {len(latencies) / elapsed:8.0f} req/s  "
+          f"p50 {pct(0.50):7.2f} ms  p95 {pct(0.95):7.2f} ms  p99 {pct(0.99):7.2f} ms  errors {errors}")
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+        auth = await seed(client, args.chats)
+        for c in args.concurrency:
+            await run_level(client, c, args.requests, auth)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--chats", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
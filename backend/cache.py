@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from fastapi import Request, Response
+
+
+CACHE_TTL = int(os.getenv("CACHE_TTL_SECONDS", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "2048"))
+
+
+class MemoryCache:
+    """
+    In-process LRU with per-entry expiry. All backends store (etag, body)
+    pairs and share the same coroutine interface.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    async def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    async def set(self, key, value, ttl=CACHE_TTL):
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def invalidate(self, prefix):
+        for key in [k for k in self.entries if k.startswith(prefix)]:
+            del self.entries[key]
+
+
+class RedisCache:
+    """
+    Same interface backed by a Redis-compatible server, so that every
+    worker sees the same entries and invalidations.
+    """
+
+    def __init__(self, url):
+        import redis.asyncio as redis
+        self.redis = redis.from_url(url)
+
+    async def get(self, key):
+        raw = await self.redis.get(f"cache:{key}")
+        if raw is None:
+            return None
+        etag, body = raw.split(b"\n", 1)
+        return etag.decode("ascii"), body
+
+    async def set(self, key, value, ttl=CACHE_TTL):
+        etag, body = value
+        await self.redis.set(f"cache:{key}", etag.encode("ascii") + b"\n" + body, ex=ttl)
+
+    async def invalidate(self, prefix):
+        keys = [k async for k in self.redis.scan_iter(match=f"cache:{prefix}*", count=500)]
+        if keys:
+            await self.redis.delete(*keys)
+
+
+def create_cache(url=None):
+    url = url or os.getenv("CACHE_URL")
+    if url and url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCache(url)
+    return MemoryCache()
+
+
+def etag_matches(request, etag):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+async def cached_json(cache, request: Request, key, build, ttl=CACHE_TTL):
+    """
+    Serves the JSON payload produced by `build()` from cache, serializing
+    it once per TTL. Clients that send back the current ETag in
+    If-None-Match get an empty 304.
+    """
+    entry = await cache.get(key)
+    if entry is None:
+        body = json.dumps(await build(), separators=(",", ":")).encode("utf-8")
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        entry = (etag, body)
+        await cache.set(key, entry, ttl)
+
+    etag, body = entry
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
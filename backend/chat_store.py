@@ -0,0 +1,191 @@
+import logging
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from pagination import decode_cursor, encode_cursor, keyset_filter
+
+
+def bucket_key(ts):
+    """
+    Messages are grouped into one bucket document per chat per UTC day,
+    keyed by the date prefix of the ISO timestamp.
+    """
+    return ts[:10]
+
+
+async def append_message(collection, chat_id, sender, text, ts):
+    msg = {"_id": ObjectId(), "sender": sender, "text": text, "timestamp": ts}
+    await collection.update_one(
+        {"chat_id": chat_id, "bucket": bucket_key(ts)},
+        {
+            "$push": {"messages": msg},
+            "$inc": {"count": 1},
+            "$max": {"last_timestamp": ts}
+        },
+        upsert=True
+    )
+    return msg
+
+
+def serialize_message(msg):
+    return {"id": str(msg["_id"]), "sender": msg["sender"], "text": msg["text"], "timestamp": msg["timestamp"]}
+
+
+async def fetch_messages(collection, chat_id, after=None, limit=None, newest=False):
+    """
+    Returns (messages, cursor). Messages are in (timestamp, _id) order,
+    limited to those after the `after` cursor and to the first `limit`,
+    or with `newest` the last `limit`. cursor points at the last message
+    returned (or is `after` when there are none) and is what the client
+    passes back as `after` to fetch the next delta.
+    """
+    bucket_match = {"chat_id": chat_id}
+    if after:
+        ts, _ = decode_cursor(after)
+        # Every message sorting after the cursor lives in its day's bucket or a later one.
+        bucket_match["bucket"] = {"$gte": bucket_key(ts)}
+
+    order = -1 if newest else 1
+    pipeline = [{"$match": bucket_match}, {"$sort": {"bucket": order}}]
+    if newest and limit:
+        # Buckets are never empty, so the last `limit` messages are in the last `limit` buckets.
+        pipeline.append({"$limit": limit})
+    pipeline += [{"$unwind": "$messages"}, {"$replaceRoot": {"newRoot": "$messages"}}]
+    if after:
+        pipeline.append({"$match": keyset_filter({}, after, 1)})
+    pipeline.append({"$sort": {"timestamp": order, "_id": order}})
+    if limit:
+        pipeline.append({"$limit": limit})
+
+    messages = [m async for m in collection.aggregate(pipeline)]
+    if newest:
+        messages.reverse()
+    cursor = encode_cursor(messages[-1]) if messages else after
+    return [serialize_message(m) for m in messages], cursor
+
+
+async def copy_message(collection, chat_id, msg):
+    """
+    Adds `msg` to its bucket unless a message with the same _id is already
+    there. Returns 1 if it was added.
+    """
+    query = {"chat_id": chat_id, "bucket": bucket_key(msg["timestamp"]), "messages._id": {"$ne": msg["_id"]}}
+    update = {
+        "$push": {"messages": msg},
+        "$inc": {"count": 1},
+        "$max": {"last_timestamp": msg["timestamp"]}
+    }
+    try:
+        result = await collection.update_one(query, update, upsert=True)
+    except DuplicateKeyError:
+        # The bucket exists, and either holds the message already or was
+        # created by another writer since the update looked for it.
+        result = await collection.update_one(query, update)
+    return 1 if result.modified_count or result.upserted_id else 0
+
+
+async def migrate_embedded_messages(chats, collection):
+    """
+    Moves messages still embedded in legacy chat documents into buckets.
+    Each message is first given an _id stored on the legacy document,
+    then copied, and the array is unset only once every id is found in a
+    bucket. A crash leaves the array in place, and a rerun, or another
+    worker migrating at the same time, skips messages already copied.
+    """
+    moved = 0
+    projection = {"chat_id": 1, "mentor": 1, "student": 1, "messages": 1}
+    async for chat in chats.find({"messages": {"$exists": True}}, projection):
+        messages = chat["messages"]
+        if not all("_id" in m for m in messages):
+            with_ids = [{"_id": ObjectId(), **m} for m in messages]
+            result = await chats.update_one({"_id": chat["_id"], "messages": messages}, {"$set": {"messages": with_ids}})
+            if not result.modified_count:
+                # Another worker assigned ids (or finished) first; go with its copy.
+                chat = await chats.find_one({"_id": chat["_id"], "messages": {"$exists": True}}, projection)
+                if not chat:
+                    continue
+                with_ids = chat["messages"]
+            messages = with_ids
+
+        chat_id = chat.get("chat_id") or f"{chat['mentor']}__{chat['student']}"
+        for m in messages:
+            moved += await copy_message(collection, chat_id, {
+                "_id": m["_id"], "sender": m["sender"], "text": m["text"], "timestamp": m["timestamp"]
+            })
+
+        ids = [m["_id"] for m in messages]
+        found = await collection.aggregate([
+            {"$match": {"chat_id": chat_id, "messages._id": {"$in": ids}}},
+            {"$unwind": "$messages"},
+            {"$match": {"messages._id": {"$in": ids}}},
+            {"$count": "n"}
+        ]).to_list(1)
+        if (found[0]["n"] if found else 0) < len(ids):
+            logging.warning(f"Chat {chat_id}: not every message reached a bucket; keeping the embedded copy")
+            continue
+        await chats.update_one({"_id": chat["_id"], "messages": messages}, {"$unset": {"messages": ""}})
+    return moved
+
+
+async def dedupe_chats(chats):
+    """
+    Folds chat documents created twice by racing first messages into one,
+    so that the unique chat_id index can be built.
+    """
+    await chats.update_many(
+        {"chat_id": {"$exists": False}},
+        [{"$set": {"chat_id": {"$concat": ["$mentor", "__", "$student"]}}}]
+    )
+    dupes = chats.aggregate([
+        # $last then picks the most recent message, not the newest document.
+        {"$sort": {"last_timestamp": 1, "_id": 1}},
+        {"$group": {
+            "_id": "$chat_id",
+            "keep": {"$min": "$_id"},
+            "ids": {"$push": "$_id"},
+            "unread_for_student": {"$sum": "$unread_for_student"},
+            "unread_for_mentor": {"$sum": "$unread_for_mentor"},
+            "last_message": {"$last": "$last_message"},
+            "last_timestamp": {"$max": "$last_timestamp"},
+            "count": {"$sum": 1}
+        }},
+        {"$match": {"count": {"$gt": 1}}}
+    ])
+    async for d in dupes:
+        keep = d["keep"]
+        extra = [i for i in d["ids"] if i != keep]
+        await chats.update_one({"_id": keep}, {"$set": {
+            "unread_for_student": d["unread_for_student"],
+            "unread_for_mentor": d["unread_for_mentor"],
+            "last_message": d["last_message"],
+            "last_timestamp": d["last_timestamp"]
+        }})
+        await chats.delete_many({"_id": {"$in": extra}})
+
+
+async def upsert_chat_summary(chats, chat_id, mentor_email, student_username, unread_field, text, ts):
+    """
+    Creates the chat summary on first message and bumps it on every later
+    one in a single atomic round trip. Returns the updated unread count
+    and whether this message created the chat.
+    """
+    other_field = "unread_for_mentor" if unread_field == "unread_for_student" else "unread_for_student"
+    chat = await chats.find_one_and_update(
+        {"chat_id": chat_id},
+        {
+            "$set": {"last_message": text, "last_timestamp": ts},
+            "$inc": {unread_field: 1},
+            "$setOnInsert": {
+                "mentor": mentor_email, "student": student_username, other_field: 0, "created_at": ts
+            }
+        },
+        projection={unread_field: 1},
+        upsert=True,
+        # Only the pre-update document tells an insert apart reliably: it
+        # is None exactly when this call created the chat.
+        return_document=ReturnDocument.BEFORE
+    )
+    if chat is None:
+        return 1, True
+    return chat.get(unread_field, 0) + 1, False
@@ -0,0 +1,188 @@
+"""
+Tiered chatbot engine. Every message is safety-checked first; then the
+rule-based keyword matcher and the FAISS knowledge base get a chance to
+answer locally, and only messages neither can answer confidently are
+sent to the remote LLM.
+"""
+import logging
+import os
+import re
+import sys
+import time
+from collections import Counter
+from fastapi.concurrency import run_in_threadpool
+
+from metrics import LatencyRecorder
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../AI"))
+import Custom_Chatbot_Module as rules
+import Intent_Detection as intents
+from micro_batcher import InferenceBatchers
+
+
+LOCAL_INTENTS = set(os.getenv(
+    "CHATBOT_LOCAL_INTENTS", "greetings,gratitude,grounding_exercise,affirmations"
+).split(","))
+KEYWORD_MIN_SCORE = int(os.getenv("CHATBOT_KEYWORD_MIN_SCORE", "1"))
+KEYWORD_MAX_WORDS = int(os.getenv("CHATBOT_KEYWORD_MAX_WORDS", "8"))
+KB_MIN_SCORE = float(os.getenv("CHATBOT_KB_MIN_SCORE", "0.6"))
+KB_EXCERPT_WORDS = int(os.getenv("CHATBOT_KB_EXCERPT_WORDS", "60"))
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "0") == "1"
+
+TIERS = ("safety", "keyword", "knowledge_base", "llm")
+
+
+def excerpt(chunk, question, max_words=KB_EXCERPT_WORDS):
+    """
+    The sentence of `chunk` sharing most words with `question`, followed
+    by as many of the next sentences as fit in `max_words`.
+    """
+    sentences = [s for s in re.split(r"(?<=[.!?])\s+", chunk.strip()) if s]
+    if not sentences:
+        return chunk
+    asked = {w for w in re.findall(r"\w+", question.lower()) if len(w) > 3}
+    best = max(range(len(sentences)),
+               key=lambda i: (len(asked & set(re.findall(r"\w+", sentences[i].lower()))), -i))
+
+    words = sentences[best].split()
+    if len(words) > max_words:
+        return " ".join(words[:max_words]) + "…"
+    picked = [sentences[best]]
+    for sentence in sentences[best + 1:]:
+        words += sentence.split()
+        if len(words) > max_words:
+            break
+        picked.append(sentence)
+    return " ".join(picked)
+
+
+class ChatbotRouter:
+
+    def __init__(self, cohere, history):
+        self.cohere = cohere
+        self.history = history
+        self.stages = LatencyRecorder()
+        self.hits = Counter()
+        self.safety_fallbacks = 0
+        self.kb = None
+        self.sessions = rules.create_session_store()
+        self.inference = InferenceBatchers()
+
+    def load_knowledge_base(self):
+        try:
+            from build_knowledge_base import KnowledgeBase
+            kb = KnowledgeBase()
+            kb.warm_up()
+            self.kb = kb
+        except (ImportError, FileNotFoundError) as e:
+            logging.warning(f"Knowledge base tier disabled: {e}")
+
+    def warm_up(self):
+        intents.warm_up()
+
+    async def close(self):
+        await self.inference.close()
+        await run_in_threadpool(intents.result_cache.save)
+
+    def keyword_answer(self, message, session_id):
+        if len(message.split()) > KEYWORD_MAX_WORDS:
+            return None
+        session = rules.ChatSession(session_id, self.sessions)
+        intent, reply = session.respond(message, KEYWORD_MIN_SCORE, LOCAL_INTENTS)
+        return reply
+
+    def kb_answer(self, message, session_id):
+        if self.kb is None:
+            return None
+        results = self.kb.query(message, k=1)
+        if results and results[0]["score"] >= KB_MIN_SCORE:
+            meta = results[0]["meta"]
+            text = excerpt(results[0]["chunk"], message)
+            return f"{text}\n\nSource: {meta.get('url') or meta.get('source', 'knowledge base')}"
+        return None
+
+    async def safety_check(self, message):
+        """
+        The model cascade's verdict, or the keyword screen alone when the
+        models cannot be loaded or run, so the other tiers keep answering.
+        """
+        try:
+            return await self.inference.safety_check(message)
+        except Exception as e:
+            logging.warning(f"Safety models failed ({e}); screening with keywords only")
+            self.safety_fallbacks += 1
+            has_kw, kw = intents.simple_keyword_safety(message)
+            if has_kw:
+                return {"high_risk": True, "reason": f"keyword:{kw}", "confidence": 0.99}
+            return {"high_risk": False, "reason": "models_unavailable", "confidence": 0.0}
+
+    async def local_answer(self, message, session_id):
+        """
+        Returns (tier, reply) when the message can be answered without the
+        remote LLM, else (None, None). Crisis messages always stop here.
+        """
+        start = time.perf_counter()
+        safety = await self.safety_check(message)
+        self.stages.record("safety", time.perf_counter() - start)
+        if safety["high_risk"]:
+            self.hits["safety"] += 1
+            return "safety", rules.CRISIS_RESPONSE
+
+        for tier, answer in (("keyword", self.keyword_answer), ("knowledge_base", self.kb_answer)):
+            start = time.perf_counter()
+            reply = await run_in_threadpool(answer, message, session_id)
+            self.stages.record(tier, time.perf_counter() - start)
+            if reply:
+                self.hits[tier] += 1
+                return tier, reply
+        return None, None
+
+    async def answer(self, message, session_id=""):
+        tier, reply = await self.local_answer(message, session_id)
+        if reply is None:
+            start = time.perf_counter()
+            reply = await self.cohere.chat(message, self.history.get(session_id))
+            tier = "llm"
+            self.stages.record(tier, time.perf_counter() - start)
+            self.hits[tier] += 1
+
+        if session_id:
+            self.history.append(session_id, message, reply)
+        return tier, reply
+
+    async def stream(self, message, session_id=""):
+        """
+        Yields reply text; local answers arrive as a single chunk.
+        """
+        tier, reply = await self.local_answer(message, session_id)
+        if reply is not None:
+            if session_id:
+                self.history.append(session_id, message, reply)
+            yield reply
+            return
+
+        start = time.perf_counter()
+        parts = []
+        async for delta in self.cohere.stream(message, self.history.get(session_id)):
+            parts.append(delta)
+            yield delta
+        self.stages.record("llm", time.perf_counter() - start)
+        self.hits["llm"] += 1
+
+        reply = "".join(parts).strip()
+        if session_id and reply:
+            self.history.append(session_id, message, reply)
+
+    def snapshot(self):
+        total = sum(self.hits.values()) or 1
+        return {
+            "stages": self.stages.snapshot(),
+            "hits": {tier: self.hits[tier] for tier in TIERS},
+            "hit_rate": {tier: round(self.hits[tier] / total, 4) for tier in TIERS},
+            "models": intents.registry.report(),
+            "batching": self.inference.stats(),
+            "safety_stages": dict(intents.safety_stages),
+            "safety_fallbacks": self.safety_fallbacks,
+            "inference_cache": intents.result_cache.stats(),
+            "knowledge_base": self.kb.stats() if self.kb else None,
+        }
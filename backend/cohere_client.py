@@ -0,0 +1,157 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+import httpx
+
+
+COHERE_URL = os.getenv("COHERE_URL", "https://api.cohere.ai/v1/chat")
+COHERE_MODEL = os.getenv("COHERE_MODEL", "command-r-08-2024")
+COHERE_TIMEOUT = float(os.getenv("COHERE_TIMEOUT_SECONDS", "30"))
+COHERE_CONNECT_TIMEOUT = float(os.getenv("COHERE_CONNECT_TIMEOUT_SECONDS", "5"))
+COHERE_MAX_CONCURRENCY = int(os.getenv("COHERE_MAX_CONCURRENCY", "20"))
+COHERE_MAX_RETRIES = int(os.getenv("COHERE_MAX_RETRIES", "2"))
+
+HISTORY_TURNS = int(os.getenv("CHATBOT_HISTORY_TURNS", "6"))
+HISTORY_SESSIONS = int(os.getenv("CHATBOT_HISTORY_SESSIONS", "5000"))
+HISTORY_TTL = int(os.getenv("CHATBOT_HISTORY_TTL_SECONDS", "1800"))
+
+PREAMBLE = (
+    "You are ManasAI, an empathetic and supportive mental health "
+    "companion for students. You listen kindly, validate feelings, and "
+    "never give medical advice."
+)
+FALLBACK_REPLY = "I'm here to listen. Tell me more."
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CohereError(Exception):
+    pass
+
+
+class ChatHistory:
+    """
+    Keeps the last few turns of each chatbot session in memory, in the
+    shape Cohere expects for chat_history. Sessions expire after a period
+    of inactivity and the least recently used are dropped past the cap.
+    """
+
+    def __init__(self, turns=HISTORY_TURNS, max_sessions=HISTORY_SESSIONS, ttl=HISTORY_TTL):
+        self.turns = turns
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.sessions = OrderedDict()
+
+    def get(self, session_id):
+        entry = self.sessions.get(session_id)
+        if entry is None:
+            return []
+        touched, turns = entry
+        if time.monotonic() - touched > self.ttl:
+            del self.sessions[session_id]
+            return []
+        return list(turns)
+
+    def append(self, session_id, user_message, reply):
+        entry = self.sessions.get(session_id)
+        turns = entry[1] if entry else deque(maxlen=self.turns * 2)
+        turns.append({"role": "USER", "message": user_message})
+        turns.append({"role": "CHATBOT", "message": reply})
+        self.sessions[session_id] = (time.monotonic(), turns)
+        self.sessions.move_to_end(session_id)
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+
+
+class CohereClient:
+    """
+    One pooled HTTP client shared by all requests, with timeouts, retries
+    on transient failures and a cap on in-flight generations.
+    """
+
+    def __init__(self, url=COHERE_URL, api_key=None, max_concurrency=COHERE_MAX_CONCURRENCY):
+        self.url = url
+        self.api_key = api_key or os.getenv("COHERE_API_KEY")
+        self.slots = asyncio.Semaphore(max_concurrency)
+        self.http = None
+
+    async def start(self):
+        self.http = httpx.AsyncClient(
+            timeout=httpx.Timeout(COHERE_TIMEOUT, connect=COHERE_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=COHERE_MAX_CONCURRENCY, max_keepalive_connections=COHERE_MAX_CONCURRENCY),
+        )
+
+    async def close(self):
+        if self.http:
+            await self.http.aclose()
+
+    def request(self, message, history, stream):
+        if not self.api_key:
+            raise CohereError("Cohere API key missing.")
+        headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        payload = {
+            "model": COHERE_MODEL,
+            "preamble": PREAMBLE,
+            "message": message,
+            "chat_history": history,
+            "temperature": 0.7,
+            "stream": stream,
+        }
+        return headers, payload
+
+    async def chat(self, message, history=()):
+        headers, payload = self.request(message, list(history), stream=False)
+        async with self.slots:
+            for attempt in range(COHERE_MAX_RETRIES + 1):
+                try:
+                    res = await self.http.post(self.url, headers=headers, json=payload)
+                    if res.status_code == 200:
+                        return res.json().get("text", FALLBACK_REPLY).strip()
+                    if res.status_code not in RETRY_STATUSES:
+                        raise CohereError(res.text)
+                    error = CohereError(f"HTTP {res.status_code}: {res.text}")
+                except httpx.TransportError as e:
+                    error = CohereError(str(e) or type(e).__name__)
+
+                if attempt < COHERE_MAX_RETRIES:
+                    logging.warning(f"Cohere call failed ({error}), retrying.")
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+            raise error
+
+    async def stream(self, message, history=()):
+        """
+        Yields reply text as Cohere generates it. Retries are only possible
+        before the first token has been sent on to the caller.
+        """
+        headers, payload = self.request(message, list(history), stream=True)
+        async with self.slots:
+            for attempt in range(COHERE_MAX_RETRIES + 1):
+                started = False
+                try:
+                    async with self.http.stream("POST", self.url, headers=headers, json=payload) as res:
+                        if res.status_code != 200:
+                            body = (await res.aread()).decode("utf-8", "replace")
+                            if res.status_code not in RETRY_STATUSES:
+                                raise CohereError(body)
+                            raise httpx.HTTPStatusError(body, request=res.request, response=res)
+
+                        async for line in res.aiter_lines():
+                            if not line.strip():
+                                continue
+                            event = json.loads(line)
+                            if event.get("event_type") == "text-generation":
+                                started = True
+                                yield event.get("text", "")
+                            elif event.get("event_type") == "stream-end":
+                                if event.get("finish_reason") == "ERROR":
+                                    raise CohereError("Generation ended with an error.")
+                                return
+                        return
+                except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                    if started or attempt == COHERE_MAX_RETRIES:
+                        raise CohereError(str(e) or type(e).__name__)
+                    logging.warning(f"Cohere stream failed ({e}), retrying.")
+                    await asyncio.sleep(0.5 * 2 ** attempt)
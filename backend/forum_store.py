@@ -0,0 +1,50 @@
+from pagination import encode_cursor
+
+
+DEFAULT_LATEST_REPLIES = 3
+MAX_LATEST_REPLIES = 50
+
+
+def serialize_reply(r):
+    return {
+        "_id": str(r["_id"]),
+        "post_id": r["post_id"],
+        "username": r["username"],
+        "reply": r["reply"],
+        "type": r.get("type", "anonymous"),
+        "timestamp": r["timestamp"],
+    }
+
+
+async def reply_summaries(replies, post_ids, latest=DEFAULT_LATEST_REPLIES):
+    """
+    Returns {post_id: {"count": n, "latest": [...], "earlier_cursor": c}}
+    for every requested post in one aggregation. `latest` holds the newest
+    replies, oldest first; pass latest=0 to fetch counts only. When older
+    replies exist, `earlier_cursor` continues from the oldest one shown
+    with GET /forum/replies/{post_id}?newest=true.
+    """
+    group = {"_id": "$post_id", "count": {"$sum": 1}}
+    if latest:
+        # $topN keeps only `latest` replies per post while grouping, instead
+        # of buffering every reply and slicing afterwards.
+        group["latest"] = {"$topN": {
+            "n": latest,
+            "sortBy": {"timestamp": -1, "_id": -1},
+            "output": "$$ROOT",
+        }}
+
+    pipeline = [
+        {"$match": {"post_id": {"$in": post_ids}}},
+        {"$group": group},
+    ]
+
+    summaries = {pid: {"count": 0, "latest": [], "earlier_cursor": None} for pid in post_ids}
+    async for row in replies.aggregate(pipeline, allowDiskUse=True):
+        newest = row.get("latest", [])
+        summaries[row["_id"]] = {
+            "count": row["count"],
+            "latest": [serialize_reply(r) for r in reversed(newest)],
+            "earlier_cursor": encode_cursor(newest[-1]) if newest and row["count"] > len(newest) else None,
+        }
+    return summaries
@@ -0,0 +1,154 @@
+"""
+Index definitions for every collection, created idempotently at startup,
+plus a query-plan audit that explains each route's query and flags any
+collection scan:
+
+    python indexes.py            # audit only
+    python indexes.py --create   # create indexes, then audit
+"""
+import argparse
+import asyncio
+import os
+import sys
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from chat_store import dedupe_chats
+from database import create_client
+
+
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING), ("type", ASCENDING)]),
+        IndexModel([("username", ASCENDING)]),
+        IndexModel([("type", ASCENDING)]),
+    ],
+    "posts": [
+        IndexModel([("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("username", ASCENDING)]),
+    ],
+    "replies": [
+        IndexModel([("post_id", ASCENDING), ("timestamp", ASCENDING), ("_id", ASCENDING)]),
+    ],
+    "chats": [
+        IndexModel([("chat_id", ASCENDING)], unique=True),
+        IndexModel([("student", ASCENDING), ("last_timestamp", DESCENDING)]),
+        IndexModel([("mentor", ASCENDING), ("last_timestamp", DESCENDING)]),
+    ],
+    "chat_messages": [
+        IndexModel([("chat_id", ASCENDING), ("bucket", ASCENDING)], unique=True),
+    ],
+    "stories": [
+        IndexModel([("timestamp", DESCENDING), ("_id", DESCENDING)]),
+    ],
+}
+
+
+async def ensure_indexes(db):
+    # The unique chat_id index cannot be built while racing first messages
+    # from before it existed have left duplicate chat documents behind.
+    await dedupe_chats(db.chats)
+    for collection, models in INDEXES.items():
+        await db[collection].create_indexes(models)
+
+
+SAMPLE_EMAIL = "mentor@example.com"
+SAMPLE_USER = "student"
+SAMPLE_CHAT = f"{SAMPLE_EMAIL}__{SAMPLE_USER}"
+SAMPLE_TS = "2025-01-01T00:00:00+00:00"
+
+# (route, collection, command) for each query issued by server.py.
+ROUTE_QUERIES = [
+    ("POST /register/mentor", "users", {"find": "users", "filter": {"email": SAMPLE_EMAIL, "type": "mentor"}, "limit": 1}),
+    ("POST /login/email", "users", {"find": "users", "filter": {"email": SAMPLE_EMAIL}, "limit": 1}),
+    ("POST /login/anonymous", "users", {"find": "users", "filter": {"username": SAMPLE_USER}, "limit": 1}),
+    ("POST /forum/post", "users", {
+        "find": "users", "filter": {"$or": [{"email": SAMPLE_USER}, {"username": SAMPLE_USER}]}, "limit": 1
+    }),
+    ("GET /forum/all", "posts", {
+        "find": "posts", "filter": {}, "sort": {"timestamp": -1, "_id": -1}, "limit": 21
+    }),
+    ("GET /forum/replies/{post_id}", "replies", {
+        "find": "replies", "filter": {"post_id": "0" * 24}, "sort": {"timestamp": 1, "_id": 1}, "limit": 21
+    }),
+    ("GET /forum/replies/{post_id}?newest=true", "replies", {
+        "find": "replies", "filter": {"post_id": "0" * 24}, "sort": {"timestamp": -1, "_id": -1}, "limit": 21
+    }),
+    ("GET /forum/replies/batch", "replies", {
+        "aggregate": "replies",
+        "pipeline": [
+            {"$match": {"post_id": {"$in": ["0" * 24, "1" * 24]}}},
+            {"$group": {"_id": "$post_id", "count": {"$sum": 1}, "latest": {"$topN": {
+                "n": 3, "sortBy": {"timestamp": -1, "_id": -1}, "output": "$$ROOT"
+            }}}}
+        ],
+        "cursor": {}
+    }),
+    ("POST /chat/send", "chats", {"find": "chats", "filter": {"chat_id": SAMPLE_CHAT}, "limit": 1}),
+    ("GET /chat/{chat_id}/messages", "chat_messages", {
+        "aggregate": "chat_messages",
+        "pipeline": [{"$match": {"chat_id": SAMPLE_CHAT, "bucket": {"$gte": SAMPLE_TS[:10]}}}, {"$sort": {"bucket": 1}}],
+        "cursor": {}
+    }),
+    ("GET /chat/student/{student_username}", "chats", {
+        "find": "chats", "filter": {"student": SAMPLE_USER}, "sort": {"last_timestamp": -1}
+    }),
+    ("GET /chat/mentor/{mentor_email}", "chats", {
+        "find": "chats", "filter": {"mentor": SAMPLE_EMAIL}, "sort": {"last_timestamp": -1}
+    }),
+    ("GET /mentor/profile/{email}", "users", {
+        "find": "users", "filter": {"email": SAMPLE_EMAIL, "type": "mentor"}, "limit": 1
+    }),
+    ("GET /mentors/all", "users", {"find": "users", "filter": {"type": "mentor"}}),
+    ("GET /stories/all", "stories", {
+        "find": "stories", "filter": {}, "sort": {"timestamp": -1, "_id": -1}, "limit": 21
+    }),
+]
+
+
+def winning_stages(plan, found=None, inside=False):
+    """
+    Collects the stage names of every winning plan in an explain result,
+    which may be nested under aggregation or SBE wrappers.
+    """
+    found = [] if found is None else found
+    if isinstance(plan, dict):
+        if inside and "stage" in plan:
+            found.append(plan["stage"])
+        for key, value in plan.items():
+            if key == "rejectedPlans":
+                continue
+            winning_stages(value, found, inside or key == "winningPlan")
+    elif isinstance(plan, list):
+        for value in plan:
+            winning_stages(value, found, inside)
+    return found
+
+
+async def audit(db):
+    flagged = []
+    for route, collection, command in ROUTE_QUERIES:
+        plan = await db.command({"explain": command, "verbosity": "queryPlanner"})
+        stages = winning_stages(plan)
+        status = "COLLSCAN" if "COLLSCAN" in stages else "ok"
+        if status != "ok":
+            flagged.append(route)
+        print(f"{status:<9} {route:<38} {collection:<14} {' > '.join(stages)}")
+    return flagged
+
+
+async def main(args):
+    db = create_client(args.uri)[args.db]
+    if args.create:
+        await ensure_indexes(db)
+    flagged = await audit(db)
+    if flagged:
+        print(f"\n{len(flagged)} route(s) scan a whole collection: {', '.join(flagged)}")
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uri", default=os.getenv("MONGO_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--db", default=os.getenv("MONGO_DB", "manas"))
+    parser.add_argument("--create", action="store_true")
+    sys.exit(asyncio.run(main(parser.parse_args())))
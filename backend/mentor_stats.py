@@ -0,0 +1,83 @@
+"""
+Denormalized per-mentor counters kept on the mentor's user document under
+`stats`, so profile views never have to count posts. chats_count is
+the number of chats ever started with the mentor. Write paths bump
+them incrementally; `reconcile` recomputes them from the source
+collections to repair any drift:
+
+    python mentor_stats.py
+"""
+import asyncio
+import logging
+import os
+
+
+RECONCILE_INTERVAL = int(os.getenv("MENTOR_STATS_RECONCILE_SECONDS", "3600"))
+
+STAT_FIELDS = ("posts_count", "replies_count", "chats_count")
+
+
+async def invalidate_views(cache, email=None):
+    # Both the profile and the /mentors/all listing embed the counters.
+    await cache.invalidate(f"mentor_profile:{email}" if email else "mentor_profile:")
+    await cache.invalidate("mentors:")
+
+
+async def bump(users, email, field, amount=1, cache=None):
+    await users.update_one({"email": email, "type": "mentor"}, {"$inc": {f"stats.{field}": amount}})
+    if cache is not None:
+        await invalidate_views(cache, email)
+
+
+def read_stats(mentor):
+    stats = mentor.get("stats", {})
+    return {field: stats.get(field, 0) for field in STAT_FIELDS}
+
+
+async def count_by(collection, key, match):
+    counts = {}
+    async for row in collection.aggregate([{"$match": match}, {"$group": {"_id": f"${key}", "n": {"$sum": 1}}}]):
+        counts[row["_id"]] = row["n"]
+    return counts
+
+
+async def reconcile(db, cache=None):
+    """
+    Recomputes every mentor's counters from posts, replies and chats and
+    overwrites the stored values. Returns the number of mentors corrected.
+    """
+    posts = await count_by(db.posts, "username", {"type": "mentor"})
+    replies = await count_by(db.replies, "username", {"type": "mentor"})
+    chats = await count_by(db.chats, "mentor", {})
+
+    fixed = 0
+    async for mentor in db.users.find({"type": "mentor"}, {"email": 1, "stats": 1}):
+        email = mentor["email"]
+        actual = {
+            "posts_count": posts.get(email, 0),
+            "replies_count": replies.get(email, 0),
+            "chats_count": chats.get(email, 0),
+        }
+        if read_stats(mentor) != actual:
+            await db.users.update_one({"_id": mentor["_id"]}, {"$set": {"stats": actual}})
+            fixed += 1
+
+    if fixed:
+        logging.info(f"Reconciled stats for {fixed} mentor(s).")
+        if cache is not None:
+            await invalidate_views(cache)
+    return fixed
+
+
+async def reconcile_forever(db, cache=None, interval=RECONCILE_INTERVAL):
+    while True:
+        try:
+            await reconcile(db, cache)
+        except Exception as e:
+            logging.warning(f"Mentor stats reconciliation failed: {e}")
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    from database import db
+    print(f"Corrected {asyncio.run(reconcile(db))} mentor(s).")
@@ -0,0 +1,40 @@
+from collections import defaultdict, deque
+
+
+SAMPLE_SIZE = 1024
+
+
+class LatencyRecorder:
+    """
+    Keeps per-endpoint request counts, error counts and a rolling window of
+    recent latencies for percentile reporting.
+    """
+
+    def __init__(self, sample_size=SAMPLE_SIZE):
+        self.counts = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.totals = defaultdict(float)
+        self.samples = defaultdict(lambda: deque(maxlen=sample_size))
+
+    def record(self, key, seconds, failed=False):
+        self.counts[key] += 1
+        self.totals[key] += seconds
+        self.samples[key].append(seconds)
+        if failed:
+            self.errors[key] += 1
+
+    def snapshot(self):
+        report = {}
+        for key, window in self.samples.items():
+            ordered = sorted(window)
+            pct = lambda p: round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 2)
+            report[key] = {
+                "count": self.counts[key],
+                "errors": self.errors[key],
+                "mean_ms": round(self.totals[key] / self.counts[key] * 1000, 2),
+                "p50_ms": pct(0.50),
+                "p95_ms": pct(0.95),
+                "p99_ms": pct(0.99),
+                "max_ms": round(ordered[-1] * 1000, 2),
+            }
+        return report
@@ -0,0 +1,52 @@
+"""
+Local stand-in for the Cohere chat API, for exercising the chatbot client
+without network access or API spend. It echoes the message back word by
+word, with configurable latency and failure rate:
+
+    MOCK_COHERE_ERROR_RATE=0.2 uvicorn mock_cohere:app --port 9000
+    COHERE_URL=http://127.0.0.1:9000/v1/chat COHERE_API_KEY=test uvicorn server:app
+"""
+import asyncio
+import json
+import os
+import random
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+FIRST_TOKEN_DELAY = float(os.getenv("MOCK_COHERE_FIRST_TOKEN_SECONDS", "0.3"))
+TOKEN_DELAY = float(os.getenv("MOCK_COHERE_TOKEN_SECONDS", "0.03"))
+ERROR_RATE = float(os.getenv("MOCK_COHERE_ERROR_RATE", "0.0"))
+ERROR_STATUS = int(os.getenv("MOCK_COHERE_ERROR_STATUS", "503"))
+
+app = FastAPI()
+
+
+def reply_words(payload):
+    turns = len(payload.get("chat_history", [])) // 2
+    return f"(turn {turns + 1}) I hear you saying: {payload.get('message', '')}".split()
+
+
+@app.post("/v1/chat")
+async def chat(request: Request):
+    if not request.headers.get("authorization", "").startswith("Bearer "):
+        return JSONResponse({"message": "invalid api token"}, status_code=401)
+
+    payload = await request.json()
+    await asyncio.sleep(FIRST_TOKEN_DELAY)
+    if random.random() < ERROR_RATE:
+        return JSONResponse({"message": "simulated failure"}, status_code=ERROR_STATUS)
+
+    words = reply_words(payload)
+    if not payload.get("stream"):
+        await asyncio.sleep(TOKEN_DELAY * len(words))
+        return {"text": " ".join(words)}
+
+    async def events():
+        yield json.dumps({"event_type": "stream-start", "is_finished": False}) + "\n"
+        for i, word in enumerate(words):
+            await asyncio.sleep(TOKEN_DELAY)
+            yield json.dumps({"event_type": "text-generation", "text": word if i == 0 else " " + word}) + "\n"
+        yield json.dumps({"event_type": "stream-end", "finish_reason": "COMPLETE"}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/stream+json")
@@ -0,0 +1,60 @@
+import base64
+import json
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(doc):
+    raw = json.dumps({"ts": doc["timestamp"], "id": str(doc["_id"])}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return data["ts"], ObjectId(data["id"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise HTTPException(400, "Invalid cursor.")
+
+
+def keyset_filter(base_filter, cursor, direction):
+    """
+    Restricts base_filter to documents strictly after the cursor position
+    in (timestamp, _id) order. direction is -1 for newest-first feeds.
+    """
+    if not cursor:
+        return base_filter
+
+    ts, oid = decode_cursor(cursor)
+    op = "$lt" if direction < 0 else "$gt"
+    after = {"$or": [{"timestamp": {op: ts}}, {"timestamp": ts, "_id": {op: oid}}]}
+    return {"$and": [base_filter, after]} if base_filter else after
+
+
+async def fetch_page(collection, base_filter=None, cursor=None, limit=DEFAULT_PAGE_SIZE, direction=-1, projection=None):
+    """
+    Returns (docs, next_cursor). next_cursor is None on the last page.
+    One extra document is read to tell whether another page exists.
+    """
+    query = keyset_filter(base_filter or {}, cursor, direction)
+    docs = await (
+        collection.find(query, projection)
+        .sort([("timestamp", direction), ("_id", direction)])
+        .limit(limit + 1)
+        .to_list(limit + 1)
+    )
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1])
+
+    for d in docs:
+        d["_id"] = str(d["_id"])
+    return docs, next_cursor
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import logging
+import os
+from collections import defaultdict
+
+
+QUEUE_SIZE = 100
+
+
+def chat_channel(chat_id):
+    return f"chat:{chat_id}"
+
+
+def user_channel(user):
+    return f"user:{user}"
+
+
+class InProcessHub:
+    """
+    Fans published events out to the websocket queues of this process.
+    Subscribing is synchronous and local; publish is a coroutine so that
+    broker-backed hubs can share the same call sites.
+    """
+
+    def __init__(self):
+        self.subscribers = defaultdict(set)
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def subscribe(self, channel):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.subscribers[channel].add(queue)
+        return queue
+
+    def unsubscribe(self, channel, queue):
+        queues = self.subscribers.get(channel)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self.subscribers[channel]
+
+    def deliver(self, channel, event):
+        for queue in list(self.subscribers.get(channel, ())):
+            if queue.full():
+                # A slow client only loses its oldest pending event.
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def publish(self, channel, event):
+        self.deliver(channel, event)
+
+
+class RedisHub(InProcessHub):
+    """
+    Relays events through a Redis-compatible broker so that every worker
+    sees events published by any other worker. Local subscribers are still
+    served from in-process queues by a single listener task.
+    """
+
+    def __init__(self, url):
+        super().__init__()
+        import redis.asyncio as redis
+        self.redis = redis.from_url(url)
+        self.listener = None
+
+    async def start(self):
+        pubsub = self.redis.pubsub()
+        await pubsub.psubscribe("chat:*", "user:*")
+        self.listener = asyncio.create_task(self.listen(pubsub))
+
+    async def close(self):
+        if self.listener:
+            self.listener.cancel()
+        await self.redis.aclose()
+
+    async def listen(self, pubsub):
+        async for msg in pubsub.listen():
+            if msg["type"] != "pmessage":
+                continue
+            try:
+                self.deliver(msg["channel"].decode(), json.loads(msg["data"]))
+            except ValueError as e:
+                logging.warning(f"Dropped malformed pubsub event: {e}")
+
+    async def publish(self, channel, event):
+        await self.redis.publish(channel, json.dumps(event))
+
+
+def create_hub(url=None):
+    url = url or os.getenv("PUBSUB_URL")
+    if url and url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisHub(url)
+    return InProcessHub()
@@ -1,18 +1,39 @@
 import os
 from dotenv import load_dotenv 
 load_dotenv()
-import requests
+import asyncio
+import json
+import logging
+import time
 from datetime import datetime, timezone
 from bson import ObjectId
-from fastapi import FastAPI, Form, HTTPException
+from fastapi import Depends, FastAPI, Form, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from passlib.hash import bcrypt
-from pymongo import MongoClient
+from fastapi.responses import FileResponse, StreamingResponse
+from auth import (
+    hash_password, issue_session_token, require_session, require_user, start_pool, stop_pool, verify_password,
+    verify_session_token
+)
+from cache import cached_json, create_cache
+from chat_store import (
+    append_message, fetch_messages, migrate_embedded_messages, serialize_message, upsert_chat_summary
+)
+from chatbot_router import MODEL_WARMUP, ChatbotRouter
+from cohere_client import ChatHistory, CohereClient, CohereError
+from database import db
+from forum_store import DEFAULT_LATEST_REPLIES, MAX_LATEST_REPLIES, reply_summaries
+from indexes import ensure_indexes
+from mentor_stats import bump, read_stats, reconcile_forever
+from metrics import LatencyRecorder
+from pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, fetch_page
+from pubsub import chat_channel, create_hub, user_channel
 
 
 app = FastAPI()
+# Long-running startup work, cancelled on shutdown.
+app.state.background_tasks = []
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,11 +43,76 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-client = MongoClient("mongodb://localhost:27017")
-db = client.manas
+hub = create_hub()
+latency = LatencyRecorder()
+cache = create_cache()
+cohere = CohereClient()
+chatbot_history = ChatHistory()
+chatbot = ChatbotRouter(cohere, chatbot_history)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 FRONTEND_DIR = os.path.join(BASE_DIR, "../Frontend")
 
+POST_FIELDS = {"username": 1, "message": 1, "type": 1, "timestamp": 1}
+REPLY_FIELDS = {"post_id": 1, "username": 1, "reply": 1, "type": 1, "timestamp": 1}
+STORY_FIELDS = {"username": 1, "text": 1, "timestamp": 1}
+
+
+@app.on_event("startup")
+async def create_indexes():
+    await ensure_indexes(db)
+    await migrate_embedded_messages(db.chats, db.chat_messages)
+
+
+def log_task_failure(task):
+    if not task.cancelled() and task.exception() is not None:
+        logging.error(f"Background task {task.get_name()} failed", exc_info=task.exception())
+
+
+def start_background(name, coro):
+    task = asyncio.create_task(coro, name=name)
+    task.add_done_callback(log_task_failure)
+    app.state.background_tasks.append(task)
+
+
+@app.on_event("startup")
+async def start_hub():
+    await hub.start()
+    await cohere.start()
+    start_pool()
+    await run_in_threadpool(chatbot.load_knowledge_base)
+    if MODEL_WARMUP:
+        start_background("model_warmup", run_in_threadpool(chatbot.warm_up))
+    start_background("mentor_stats_reconcile", reconcile_forever(db, cache))
+
+
+@app.on_event("shutdown")
+async def stop_hub():
+    tasks = app.state.background_tasks
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    tasks.clear()
+    await hub.close()
+    await cohere.close()
+    await chatbot.close()
+    stop_pool()
+
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    if route is not None and getattr(route, "path", "/") != "/":
+        latency.record(f"{request.method} {route.path}", time.perf_counter() - start, response.status_code >= 500)
+    return response
+
+
+@app.get("/metrics")
+async def get_metrics():
+    return {"latency": latency.snapshot(), "chatbot": chatbot.snapshot()}
+
+
 @app.get("/")
 async def read_root():
     return FileResponse(os.path.join(FRONTEND_DIR, "index.html"))
@@ -43,40 +129,41 @@ def make_chat_id(mentor_email: str, student_username: str) -> str:
 
 
 @app.post("/register/mentor")
-def register_mentor(email: str = Form(...), password: str = Form(...)):
-    if db.users.find_one({"email": email, "type": "mentor"}):
+async def register_mentor(email: str = Form(...), password: str = Form(...)):
+    if await db.users.find_one({"email": email, "type": "mentor"}):
         raise HTTPException(400, "Email already registered as a mentor.")
 
-    db.users.insert_one({
+    await db.users.insert_one({
         "email": email,
-        "password": bcrypt.hash(password),
+        "password": await hash_password(password),
         "type": "mentor",
         "joined_on": datetime.now(timezone.utc).isoformat()
     })
 
+    await cache.invalidate("mentors:")
     return {"message": f"Welcome, Mentor ({email})! Account created successfully."}
 
 
 @app.post("/login/email")
-def login_mentor(email: str = Form(...), password: str = Form(...)):
-    user = db.users.find_one({"email": email})
+async def login_mentor(email: str = Form(...), password: str = Form(...)):
+    user = await db.users.find_one({"email": email})
     if not user:
         raise HTTPException(401, "Mentor not found. Please register.")
 
-    if not bcrypt.verify(password, user["password"]):
+    if not await verify_password(password, user["password"]):
         raise HTTPException(401, "Invalid password.")
 
-    return {"message": f"Welcome back, {email}!"}
+    return {"message": f"Welcome back, {email}!", "token": issue_session_token(email, user["type"])}
 
 
 @app.post("/register/anonymous")
-def register_anonymous(username: str = Form(...), password: str = Form(...)):
-    if db.users.find_one({"username": username}):
+async def register_anonymous(username: str = Form(...), password: str = Form(...)):
+    if await db.users.find_one({"username": username}):
         raise HTTPException(400, "Nickname already taken.")
 
-    db.users.insert_one({
+    await db.users.insert_one({
         "username": username,
-        "password": bcrypt.hash(password),
+        "password": await hash_password(password),
         "type": "anonymous",
         "joined_on": datetime.now(timezone.utc).isoformat()
     })
@@ -85,75 +172,129 @@ def register_anonymous(username: str = Form(...), password: str = Form(...)):
 
 
 @app.post("/login/anonymous")
-def login_anonymous(username: str = Form(...), password: str = Form(...)):
-    user = db.users.find_one({"username": username})
+async def login_anonymous(username: str = Form(...), password: str = Form(...)):
+    user = await db.users.find_one({"username": username})
     if not user:
         raise HTTPException(401, "User not found. Please register.")
 
-    if not bcrypt.verify(password, user["password"]):
+    if not await verify_password(password, user["password"]):
         raise HTTPException(401, "Invalid password.")
 
-    return {"message": f"Welcome back, {username}!", "username": username}
+    return {
+        "message": f"Welcome back, {username}!",
+        "username": username,
+        "token": issue_session_token(username, user["type"])
+    }
+
+
+@app.get("/session")
+async def get_session(session: dict = Depends(require_session)):
+    return {"user": session["sub"], "type": session["type"], "expires": session["exp"]}
 
 
 
 @app.post("/forum/post")
-def create_post(username: str = Form(...), message: str = Form(...)):
-    user = db.users.find_one({"$or": [{"email": username}, {"username": username}]})
+async def create_post(username: str = Form(...), message: str = Form(...), session: dict = Depends(require_session)):
+    require_user(session, username)
+    user = await db.users.find_one({"$or": [{"email": username}, {"username": username}]})
     user_type = user["type"] if user else "anonymous"
 
-    db.posts.insert_one({
+    await db.posts.insert_one({
         "username": username,
         "message": message,
         "type": user_type,
         "timestamp": datetime.now(timezone.utc).isoformat()
     })
+    await cache.invalidate("forum:")
+    if user_type == "mentor":
+        await bump(db.users, username, "posts_count", cache=cache)
     return {"message": "Post added successfully!"}
 
 
 @app.get("/forum/all")
-def get_all_posts():
-    posts = list(db.posts.find().sort("timestamp", -1))
-    for p in posts:
-        p["_id"] = str(p["_id"])
-    return {"posts": posts}
+async def get_all_posts(
+    request: Request,
+    cursor: str = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    with_reply_counts: bool = Query(False)
+):
+    async def build():
+        posts, next_cursor = await fetch_page(db.posts, cursor=cursor, limit=limit, projection=POST_FIELDS)
+        if with_reply_counts and posts:
+            summaries = await reply_summaries(db.replies, [p["_id"] for p in posts], latest=0)
+            for p in posts:
+                p["reply_count"] = summaries[p["_id"]]["count"]
+        return {"posts": posts, "next_cursor": next_cursor}
+
+    return await cached_json(cache, request, f"forum:{cursor}:{limit}:{with_reply_counts}", build)
 
 
 @app.post("/forum/reply")
-def add_reply(post_id: str = Form(...), username: str = Form(...), reply: str = Form(...)):
-    if not db.posts.find_one({"_id": ObjectId(post_id)}):
+async def add_reply(
+    post_id: str = Form(...), username: str = Form(...), reply: str = Form(...),
+    session: dict = Depends(require_session)
+):
+    require_user(session, username)
+    if not await db.posts.find_one({"_id": ObjectId(post_id)}):
         raise HTTPException(404, "Post not found")
 
-    user = db.users.find_one({"$or": [{"email": username}, {"username": username}]})
+    user = await db.users.find_one({"$or": [{"email": username}, {"username": username}]})
     user_type = user["type"] if user else "anonymous"
 
-    db.replies.insert_one({
+    await db.replies.insert_one({
         "post_id": post_id,
         "username": username,
         "reply": reply,
         "type": user_type,
         "timestamp": datetime.now(timezone.utc).isoformat()
     })
+    await cache.invalidate("forum:")
+    if user_type == "mentor":
+        await bump(db.users, username, "replies_count", cache=cache)
 
     return {"message": "Reply added"}
 
 
+@app.get("/forum/replies/batch")
+async def get_replies_batch(
+    post_ids: list[str] = Query(...),
+    latest: int = Query(DEFAULT_LATEST_REPLIES, ge=0, le=MAX_LATEST_REPLIES)
+):
+    if len(post_ids) > MAX_PAGE_SIZE:
+        raise HTTPException(400, f"At most {MAX_PAGE_SIZE} post_ids per request.")
+    return {"replies": await reply_summaries(db.replies, list(dict.fromkeys(post_ids)), latest)}
+
+
 @app.get("/forum/replies/{post_id}")
-def get_replies(post_id: str):
-    replies = list(db.replies.find({"post_id": post_id}).sort("timestamp", 1))
-    for r in replies:
-        r["_id"] = str(r["_id"])
-    return {"replies": replies}
+async def get_replies(
+    post_id: str,
+    cursor: str = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    newest: bool = Query(False)
+):
+    # newest=true pages backwards from the latest reply; next_cursor then
+    # points at older replies.
+    replies, next_cursor = await fetch_page(
+        db.replies, {"post_id": post_id}, cursor=cursor, limit=limit,
+        direction=-1 if newest else 1, projection=REPLY_FIELDS
+    )
+    return {"replies": replies, "next_cursor": next_cursor}
 
 
 
 @app.post("/chat/start")
-def start_chat(student_username: str = Form(...), mentor_email: str = Form(...)):
+async def start_chat(
+    student_username: str = Form(...), mentor_email: str = Form(...), session: dict = Depends(require_session)
+):
+    require_user(session, student_username, mentor_email)
     return {"chat_id": make_chat_id(mentor_email, student_username)}
 
 
 @app.post("/chat/send")
-def send_message(chat_id: str = Form(...), sender: str = Form(...), text: str = Form(...)):
+async def send_message(
+    chat_id: str = Form(...), sender: str = Form(...), text: str = Form(...),
+    session: dict = Depends(require_session)
+):
 
     ts = datetime.now(timezone.utc).isoformat()
 
@@ -161,119 +302,182 @@ def send_message(chat_id: str = Form(...), sender: str = Form(...), text: str =
         mentor_email, student_username = chat_id.split("__", 1)
     except:
         raise HTTPException(400, "Invalid chat_id format.")
+    require_user(session, sender)
+    require_user(session, mentor_email, student_username)
 
-    chat = db.chats.find_one({"chat_id": chat_id})
-    if not chat:
-        db.chats.insert_one({
-            "chat_id": chat_id,
-            "mentor": mentor_email,
-            "student": student_username,
-            "messages": [],
-            "last_message": "",
-            "last_timestamp": ts,
-            "unread_for_student": 0,
-            "unread_for_mentor": 0
-        })
+    msg = await append_message(db.chat_messages, chat_id, sender, text, ts)
 
-    msg = {"sender": sender, "text": text, "timestamp": ts}
+    if sender == mentor_email:
+        recipient, unread_field = student_username, "unread_for_student"
+    else:
+        recipient, unread_field = mentor_email, "unread_for_mentor"
 
-    db.chats.update_one(
-        {"chat_id": chat_id},
-        {
-            "$push": {"messages": msg},
-            "$set": {"last_message": text, "last_timestamp": ts}
-        }
+    unread, created = await upsert_chat_summary(
+        db.chats, chat_id, mentor_email, student_username, unread_field, text, ts
     )
+    if created:
+        await bump(db.users, mentor_email, "chats_count", cache=cache)
 
-    if sender == mentor_email:
-        db.chats.update_one({"chat_id": chat_id}, {"$inc": {"unread_for_student": 1}})
-    else:
-        db.chats.update_one({"chat_id": chat_id}, {"$inc": {"unread_for_mentor": 1}})
+    await hub.publish(chat_channel(chat_id), {
+        "type": "message", "chat_id": chat_id, "message": serialize_message(msg)
+    })
+    await hub.publish(user_channel(recipient), {
+        "type": "unread", "chat_id": chat_id, unread_field: unread,
+        "last_message": text, "last_timestamp": ts
+    })
 
     return {"status": "Message sent"}
 
 
 @app.get("/chat/{chat_id}")
-def get_chat(chat_id: str):
-    chat = db.chats.find_one({"chat_id": chat_id})
+async def get_chat(chat_id: str, session: dict = Depends(require_session)):
+    chat = await db.chats.find_one({"chat_id": chat_id}, {"messages": 0})
     if not chat:
         raise HTTPException(404, "Chat not found")
+    require_user(session, chat["mentor"], chat["student"])
 
     chat["_id"] = str(chat["_id"])
+    # Only the latest page; clients continue from `cursor` with
+    # /chat/{chat_id}/messages?after=.
+    chat["messages"], chat["cursor"] = await fetch_messages(
+        db.chat_messages, chat_id, limit=DEFAULT_PAGE_SIZE, newest=True
+    )
     return chat
 
 
 @app.get("/chat/student/{student_username}")
-def get_student_chats(student_username: str):
-    chats = list(db.chats.find({"student": student_username}).sort("last_timestamp", -1))
+async def get_student_chats(student_username: str, session: dict = Depends(require_session)):
+    require_user(session, student_username)
+    chats = await db.chats.find({"student": student_username}, {"messages": 0}).sort("last_timestamp", -1).to_list(None)
 
     for c in chats:
-        if "chat_id" not in c:
-            c["chat_id"] = make_chat_id(c["mentor"], c["student"])
-            db.chats.update_one({"_id": c["_id"]}, {"$set": {"chat_id": c["chat_id"]}})
         c["_id"] = str(c["_id"])
 
     return {"chats": chats}
 
 
 @app.get("/chat/mentor/{mentor_email}")
-def get_mentor_chats(mentor_email: str):
-    chats = list(db.chats.find({"mentor": mentor_email}).sort("last_timestamp", -1))
+async def get_mentor_chats(mentor_email: str, session: dict = Depends(require_session)):
+    require_user(session, mentor_email)
+    chats = await db.chats.find({"mentor": mentor_email}, {"messages": 0}).sort("last_timestamp", -1).to_list(None)
 
     for c in chats:
-        if "chat_id" not in c:
-            c["chat_id"] = make_chat_id(c["mentor"], c["student"])
-            db.chats.update_one({"_id": c["_id"]}, {"$set": {"chat_id": c["chat_id"]}})
         c["_id"] = str(c["_id"])
 
     return {"chats": chats}
 
 
+@app.get("/chat/{chat_id}/messages")
+async def get_new_messages(
+    chat_id: str,
+    after: str = Query(None),
+    limit: int = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    newest: bool = Query(False),
+    session: dict = Depends(require_session)
+):
+    require_user(session, *chat_id.split("__", 1))
+    # `after` is the cursor returned by the previous call; newest=true
+    # with a small limit gives the tail of the chat, e.g. for previews.
+    messages, cursor = await fetch_messages(db.chat_messages, chat_id, after, limit, newest)
+    return {"messages": messages, "cursor": cursor}
+
+
 @app.post("/chat/mark_read/student/{chat_id}")
-def mark_read_student(chat_id: str):
-    db.chats.update_one({"chat_id": chat_id}, {"$set": {"unread_for_student": 0}})
+async def mark_read_student(chat_id: str, session: dict = Depends(require_session)):
+    chat = await db.chats.find_one_and_update(
+        {"chat_id": chat_id, "student": session["sub"]}, {"$set": {"unread_for_student": 0}}, projection={"student": 1}
+    )
+    if chat:
+        await hub.publish(user_channel(chat["student"]), {
+            "type": "unread", "chat_id": chat_id, "unread_for_student": 0
+        })
     return {"status": "ok"}
 
 
 @app.post("/chat/mark_read/mentor/{chat_id}")
-def mark_read_mentor(chat_id: str):
-    db.chats.update_one({"chat_id": chat_id}, {"$set": {"unread_for_mentor": 0}})
+async def mark_read_mentor(chat_id: str, session: dict = Depends(require_session)):
+    chat = await db.chats.find_one_and_update(
+        {"chat_id": chat_id, "mentor": session["sub"]}, {"$set": {"unread_for_mentor": 0}}, projection={"mentor": 1}
+    )
+    if chat:
+        await hub.publish(user_channel(chat["mentor"]), {
+            "type": "unread", "chat_id": chat_id, "unread_for_mentor": 0
+        })
     return {"status": "ok"}
 
 
+async def forward_events(websocket: WebSocket, queue: asyncio.Queue):
+    while True:
+        await websocket.send_json(await queue.get())
 
-@app.get("/mentor/profile/{email}")
-def get_mentor_profile(email: str):
-    mentor = db.users.find_one({"email": email, "type": "mentor"})
-    if not mentor:
-        raise HTTPException(status_code=404, detail="Mentor not found")
 
-    mentor["_id"] = str(mentor["_id"])
+async def stream_channel(websocket: WebSocket, channel: str, users):
+    # Browsers cannot set headers on a WebSocket, so the session token
+    # comes in the query string.
+    claims = verify_session_token(websocket.query_params.get("token", ""))
+    if not claims or claims["sub"] not in users:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    queue = hub.subscribe(channel)
+    sender = asyncio.create_task(forward_events(websocket, queue))
+    try:
+        # Incoming frames are only keep-alives; this raises on disconnect.
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        hub.unsubscribe(channel, queue)
 
-    return {
-        "email": mentor["email"],
-        "name": mentor.get("name", mentor["email"].split("@")[0]),
-        "occupation": mentor.get("occupation", "Mentor"),
-        "age": mentor.get("age", ""),
-        "bio": mentor.get("bio", "You have not added a bio yet."),
-        "city": mentor.get("city", ""),
-        "college": mentor.get("college", ""),
-        "posts_count": db.posts.count_documents({"username": mentor["email"]}),
-        "joined_on": mentor.get("joined_on", "Recently Joined")
-    }
+
+@app.websocket("/ws/chat/{chat_id}")
+async def chat_events(websocket: WebSocket, chat_id: str):
+    await stream_channel(websocket, chat_channel(chat_id), chat_id.split("__", 1))
+
+
+@app.websocket("/ws/inbox/{user}")
+async def inbox_events(websocket: WebSocket, user: str):
+    await stream_channel(websocket, user_channel(user), (user,))
+
+
+
+@app.get("/mentor/profile/{email}")
+async def get_mentor_profile(email: str, request: Request):
+    async def build():
+        mentor = await db.users.find_one({"email": email, "type": "mentor"}, {"password": 0})
+        if not mentor:
+            raise HTTPException(status_code=404, detail="Mentor not found")
+
+        return {
+            **read_stats(mentor),
+            "email": mentor["email"],
+            "name": mentor.get("name", mentor["email"].split("@")[0]),
+            "occupation": mentor.get("occupation", "Mentor"),
+            "age": mentor.get("age", ""),
+            "bio": mentor.get("bio", "You have not added a bio yet."),
+            "city": mentor.get("city", ""),
+            "college": mentor.get("college", ""),
+            "joined_on": mentor.get("joined_on", "Recently Joined")
+        }
+
+    return await cached_json(cache, request, f"mentor_profile:{email}", build)
 
 
 @app.post("/mentor/profile/update")
-def update_mentor_profile(
+async def update_mentor_profile(
     email: str = Form(...),
     name: str = Form(...),
     occupation: str = Form(...),
     age: str = Form(""),
     bio: str = Form(...),
     city: str = Form(""),
-    college: str = Form("")
+    college: str = Form(""),
+    session: dict = Depends(require_session)
 ):
-    mentor = db.users.find_one({"email": email, "type": "mentor"})
+    require_user(session, email)
+    mentor = await db.users.find_one({"email": email, "type": "mentor"})
     if not mentor:
         raise HTTPException(status_code=404, detail="Mentor not found")
 
@@ -286,74 +490,81 @@ def update_mentor_profile(
         "college": college.strip()
     }
 
-    db.users.update_one(
+    await db.users.update_one(
         {"email": email, "type": "mentor"},
         {"$set": update_data}
     )
+    await cache.invalidate("mentors:")
+    await cache.invalidate(f"mentor_profile:{email}")
 
     return {"status": "Profile updated successfully!"}
 
 @app.get("/mentors/all")
-def get_all_mentors():
-    mentors_cursor = db.users.find({"type": "mentor"}, {"password": 0})
-    mentors_list = []
-    for m in mentors_cursor:
-        m["_id"] = str(m["_id"])
-        m["name"] = m.get("name", m["email"].split("@")[0])
-        m["occupation"] = m.get("occupation", "Peer Mentor")
-        m["bio"] = m.get("bio", "Here to listen and support.")
-        mentors_list.append(m)
+async def get_all_mentors(request: Request):
+    async def build():
+        mentors_cursor = db.users.find({"type": "mentor"}, {"password": 0})
+        mentors_list = []
+        async for m in mentors_cursor:
+            m["_id"] = str(m["_id"])
+            m["name"] = m.get("name", m["email"].split("@")[0])
+            m["occupation"] = m.get("occupation", "Peer Mentor")
+            m["bio"] = m.get("bio", "Here to listen and support.")
+            mentors_list.append(m)
+        return {"mentors": mentors_list}
 
-    return {"mentors": mentors_list}
+    return await cached_json(cache, request, "mentors:all", build)
 
 
 
 @app.post("/chatbot")
-def chatbot_response(message: str = Form(...)):
-    api_key = os.getenv("COHERE_API_KEY")
-    if not api_key:
-        raise HTTPException(500, "Cohere API key missing.")
-
-    payload = {
-        "model": "command-r-08-2024",
-        "preamble":
-            "You are ManasAI, an empathetic and supportive mental health "
-            "companion for students. You listen kindly, validate feelings, and "
-            "never give medical advice.",
-        "message": message,
-        "chat_history": [],
-        "temperature": 0.7
-    }
+async def chatbot_response(message: str = Form(...), session_id: str = Form("")):
+    try:
+        tier, reply = await chatbot.answer(message, session_id)
+    except CohereError as e:
+        raise HTTPException(500, f"Cohere API error: {e}")
+    return {"reply": reply, "source": tier}
 
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
 
-    try:
-        res = requests.post("https://api.cohere.ai/v1/chat", headers=headers, json=payload)
-        if res.status_code != 200:
-            raise Exception(res.text)
+def sse(event):
+    return f"data: {json.dumps(event)}\n\n"
 
-        reply = res.json().get("text", "I'm here to listen. Tell me more.")
-        return {"reply": reply.strip()}
 
-    except Exception as e:
-        raise HTTPException(500, f"Cohere API error: {e}")
+@app.post("/chatbot/stream")
+async def chatbot_stream(message: str = Form(...), session_id: str = Form("")):
+    async def events():
+        try:
+            async for delta in chatbot.stream(message, session_id):
+                yield sse({"delta": delta})
+        except CohereError as e:
+            yield sse({"error": f"Cohere API error: {e}"})
+            return
+        yield sse({"done": True})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 
 @app.post("/stories/share")
-def share_story(username: str = Form(...), text: str = Form(...)):
-    db.stories.insert_one({
+async def share_story(username: str = Form(...), text: str = Form(...), session: dict = Depends(require_session)):
+    require_user(session, username)
+    await db.stories.insert_one({
         "username": username,
         "text": text,
         "timestamp": datetime.now(timezone.utc).isoformat()
     })
+    await cache.invalidate("stories:")
     return {"message": "Thank you for sharing your story."}
 
 @app.get("/stories/all")
-def get_all_stories():
-    stories = list(db.stories.find().sort("timestamp", -1))
-    for s in stories:
-        s["_id"] = str(s["_id"])
-    return {"stories": stories}
+async def get_all_stories(
+    request: Request,
+    cursor: str = Query(None),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+):
+    async def build():
+        stories, next_cursor = await fetch_page(db.stories, cursor=cursor, limit=limit, projection=STORY_FIELDS)
+        return {"stories": stories, "next_cursor": next_cursor}
+
+    return await cached_json(cache, request, f"stories:{cursor}:{limit}", build)
 
 
 
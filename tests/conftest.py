@@ -0,0 +1,7 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The backend and AI modules import their siblings top-level, as when run from their own folders.
+for folder in ("backend", "AI"):
+    sys.path.insert(0, os.path.join(ROOT, folder))
@@ -0,0 +1,72 @@
+"""
+Per-session state of the rule-based chatbot under concurrency, and the
+TTL and size cap of MemorySessionStore. Tokenization is stubbed with a
+plain word split so no NLTK data has to be downloaded.
+"""
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("nltk")
+
+import Custom_Chatbot_Module as rules
+from bench_sessions import converse
+
+
+@pytest.fixture(autouse=True)
+def plain_tokens(monkeypatch):
+    monkeypatch.setattr(rules, "lemmas", lambda text: re.findall(r"[a-z']+", text.lower()))
+    monkeypatch.setattr(rules, "ensure_nltk_data", lambda: None)
+    monkeypatch.setattr(rules, "compiled_bases", {})
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rules.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_sessions_are_isolated_across_threads():
+    store = rules.MemorySessionStore()
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        errors = [e for e in pool.map(lambda n: converse(store, n), range(500)) if e]
+    assert errors == []
+    assert len(store) == 500
+
+
+def test_one_followup_per_gratitude_when_a_session_is_hammered():
+    store = rules.MemorySessionStore()
+    rules.ChatSession("shared", store).respond("thank you")
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        intents = list(pool.map(lambda n: rules.ChatSession("shared", store).respond(f"marker{n}")[0], range(64)))
+    assert intents.count("followup") == 1
+    assert intents.count("default") == 63
+
+
+def test_message_with_its_own_intent_is_not_taken_as_followup():
+    # A followup is only acknowledged for messages matching no intent; the
+    # pending flag is cleared either way.
+    session = rules.ChatSession("s", rules.MemorySessionStore())
+    session.respond("thank you")
+    assert session.respond("hello")[0] == "greetings"
+    assert session.respond("marker")[0] == "default"
+
+
+def test_idle_sessions_expire(clock):
+    store = rules.MemorySessionStore(ttl=60)
+    rules.ChatSession("s", store).respond("thank you")
+    clock[0] += 59
+    assert store.load("s")["awaiting_followup"] is True
+    clock[0] += 2
+    assert store.load("s") == rules.new_state()
+    assert len(store) == 0
+
+
+def test_least_recently_saved_sessions_are_evicted_beyond_the_cap():
+    store = rules.MemorySessionStore(max_sessions=2)
+    for session_id in ("a", "b", "c"):
+        rules.ChatSession(session_id, store).respond("thank you")
+    assert list(store.sessions) == ["b", "c"]
+    assert store.load("a") == rules.new_state()
@@ -0,0 +1,65 @@
+"""
+ChatbotRouter with the safety models broken on purpose: crisis messages
+must still be caught by the keyword screen and everything else must
+still get an answer.
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("transformers")
+pytest.importorskip("nltk")
+pytest.importorskip("numpy")
+
+import Custom_Chatbot_Module as rules
+import Intent_Detection as intents
+from chatbot_router import ChatbotRouter
+from cohere_client import ChatHistory
+
+# Longer than KEYWORD_MAX_WORDS, so only the models could answer it locally.
+BENIGN = "I have been thinking about how to plan my revision for next week"
+
+
+class FakeCohere:
+
+    async def chat(self, message, history=()):
+        return f"llm: {message}"
+
+    async def stream(self, message, history=()):
+        yield f"llm: {message}"
+
+
+@pytest.fixture(autouse=True)
+def broken_models(monkeypatch):
+    def fail(name):
+        raise RuntimeError(f"{name} failed to load")
+
+    monkeypatch.setattr(intents, "get_model", fail)
+    monkeypatch.setattr(intents.result_cache, "max_entries", 0)
+
+
+def answer(message, session_id="s1"):
+    async def main():
+        router = ChatbotRouter(FakeCohere(), ChatHistory())
+        try:
+            return await router.answer(message, session_id), router.snapshot()["safety_fallbacks"]
+        finally:
+            await router.inference.close()
+    return asyncio.run(main())
+
+
+def test_benign_message_reaches_llm_when_models_fail():
+    (tier, reply), fallbacks = answer(BENIGN)
+    assert (tier, reply) == ("llm", f"llm: {BENIGN}")
+    assert fallbacks == 1
+
+
+def test_crisis_message_caught_by_keywords_when_models_fail(monkeypatch):
+    async def fail(self, text):
+        raise RuntimeError("inference thread died")
+
+    monkeypatch.setattr("micro_batcher.InferenceBatchers.safety_check", fail)
+    (tier, reply), fallbacks = answer("honestly I can't go on like this much longer")
+    assert (tier, reply) == ("safety", rules.CRISIS_RESPONSE)
+    assert fallbacks == 1
@@ -0,0 +1,120 @@
+"""
+Drives CohereClient against mock_cohere served by uvicorn on a local port,
+so retries, timeouts and streaming go through a real HTTP stack.
+"""
+import asyncio
+import socket
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+uvicorn = pytest.importorskip("uvicorn")
+pytest.importorskip("fastapi")
+
+import cohere_client
+import mock_cohere
+from cohere_client import CohereClient, CohereError
+
+
+@pytest.fixture
+def mock_url(fast_mock):
+    # One server per test, shut down before the test's patches are undone:
+    # uvicorn waits for in-flight handlers on exit, so a request a test
+    # abandoned (e.g. on timeout) cannot wake up inside the next test.
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(mock_cohere.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{port}/v1/chat"
+    server.should_exit = True
+    thread.join()
+
+
+@pytest.fixture(autouse=True)
+def fast_mock(monkeypatch):
+    monkeypatch.setattr(mock_cohere, "FIRST_TOKEN_DELAY", 0)
+    monkeypatch.setattr(mock_cohere, "TOKEN_DELAY", 0)
+    monkeypatch.setattr(mock_cohere, "ERROR_RATE", 0.0)
+    monkeypatch.setattr(cohere_client, "COHERE_MAX_RETRIES", 1)
+
+
+def fail_first(monkeypatch, failures):
+    # mock_cohere fails a request when random() < ERROR_RATE.
+    draws = iter([0.0] * failures + [1.0] * 100)
+    monkeypatch.setattr(mock_cohere, "ERROR_RATE", 0.5)
+    monkeypatch.setattr(mock_cohere, "random", SimpleNamespace(random=lambda: next(draws)))
+
+
+def run(url, use, timeout=None):
+    async def main():
+        client = CohereClient(url=url, api_key="test")
+        await client.start()
+        if timeout is not None:
+            await client.http.aclose()
+            client.http = httpx.AsyncClient(timeout=timeout)
+        try:
+            return await use(client)
+        finally:
+            await client.close()
+    return asyncio.run(main())
+
+
+async def collect(stream):
+    return [delta async for delta in stream]
+
+
+def test_chat_returns_text(mock_url):
+    history = [{"role": "USER", "message": "hi"}, {"role": "CHATBOT", "message": "hello"}]
+    reply = run(mock_url, lambda c: c.chat("exams are close", history))
+    assert reply == "(turn 2) I hear you saying: exams are close"
+
+
+def test_chat_retries_transient_errors(mock_url, monkeypatch):
+    fail_first(monkeypatch, 1)
+    assert run(mock_url, lambda c: c.chat("hello")) == "(turn 1) I hear you saying: hello"
+
+
+def test_chat_gives_up_after_retries(mock_url, monkeypatch):
+    fail_first(monkeypatch, 2)
+    with pytest.raises(CohereError, match="503"):
+        run(mock_url, lambda c: c.chat("hello"))
+
+
+def test_chat_does_not_retry_client_errors(mock_url, monkeypatch):
+    # A retry would succeed here, so getting the error shows there was none.
+    fail_first(monkeypatch, 1)
+    monkeypatch.setattr(mock_cohere, "ERROR_STATUS", 400)
+    with pytest.raises(CohereError, match="simulated failure"):
+        run(mock_url, lambda c: c.chat("hello"))
+
+
+def test_chat_times_out(mock_url, monkeypatch):
+    monkeypatch.setattr(cohere_client, "COHERE_MAX_RETRIES", 0)
+    monkeypatch.setattr(mock_cohere, "FIRST_TOKEN_DELAY", 1.0)
+    with pytest.raises(CohereError):
+        run(mock_url, lambda c: c.chat("hello"), timeout=0.2)
+
+
+def test_stream_yields_words_in_order(mock_url):
+    deltas = run(mock_url, lambda c: collect(c.stream("sleep is hard")))
+    assert len(deltas) > 1
+    assert "".join(deltas) == "(turn 1) I hear you saying: sleep is hard"
+
+
+def test_stream_retries_before_first_token(mock_url, monkeypatch):
+    fail_first(monkeypatch, 1)
+    deltas = run(mock_url, lambda c: collect(c.stream("hello")))
+    assert "".join(deltas) == "(turn 1) I hear you saying: hello"
+
+
+def test_stream_raises_after_retries(mock_url, monkeypatch):
+    fail_first(monkeypatch, 2)
+    with pytest.raises(CohereError):
+        run(mock_url, lambda c: collect(c.stream("hello")))
@@ -0,0 +1,161 @@
+"""
+Crawler behaviour against a local HTTP server: robots.txt, per-host
+spacing, and revalidation against the on-disk cache.
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("bs4")
+
+from crawler import Crawler, IncompleteCrawl, iter_crawl, robots_crawl_delay
+
+
+class Site:
+    """
+    Serves /page/<n> as a small article with an ETag, and /robots.txt
+    from `robots` (404 when None). `status` forces a response code.
+    """
+
+    def __init__(self):
+        self.robots = None
+        self.status = None
+        self.version = 0
+        self.requests = []
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler())
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+    def handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def reply(self, status, body=b"", headers=()):
+                self.send_response(status)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                with site.lock:
+                    site.requests.append((time.monotonic(), self.path))
+                if self.path == "/robots.txt":
+                    if site.robots is None:
+                        return self.reply(404)
+                    return self.reply(200, site.robots.encode())
+                if site.status:
+                    return self.reply(site.status)
+                etag = f'"{self.path}-{site.version}"'
+                if self.headers.get("If-None-Match") == etag:
+                    return self.reply(304, headers=[("ETag", etag)])
+                body = f"<html><body><article><p>{self.path} version {site.version}</p></article></body></html>"
+                return self.reply(200, body.encode(), [("ETag", etag), ("Content-Type", "text/html")])
+
+        return Handler
+
+    def page_requests(self):
+        return [path for _, path in self.requests if path != "/robots.txt"]
+
+
+@pytest.fixture
+def site():
+    site = Site()
+    yield site
+    site.server.shutdown()
+
+
+def crawl(urls, cache_dir, **options):
+    crawler = Crawler(cache_dir=str(cache_dir), parser="html.parser", **{"delay": 0, **options})
+    docs = {d["url"]: d["text"] for d in iter_crawl(urls, crawler)}
+    return docs, crawler
+
+
+def test_robots_disallow_is_honoured(site, tmp_path):
+    site.robots = "User-agent: *\nDisallow: /page/private\n"
+    urls = [site.url("/page/1"), site.url("/page/private-2"), site.url("/page/3")]
+    docs, crawler = crawl(urls, tmp_path)
+
+    assert set(docs) == {urls[0], urls[2]}
+    assert "/page/private-2" not in site.page_requests()
+    assert crawler.stats["disallowed"] == 1
+    assert [path for _, path in site.requests].count("/robots.txt") == 1
+
+
+def test_missing_robots_allows_everything(site, tmp_path):
+    urls = [site.url(f"/page/{n}") for n in range(3)]
+    docs, _ = crawl(urls, tmp_path)
+    assert set(docs) == set(urls)
+
+
+def test_robots_can_be_ignored(site, tmp_path):
+    site.robots = "User-agent: *\nDisallow: /\n"
+    docs, _ = crawl([site.url("/page/1")], tmp_path, robots=False)
+    assert len(docs) == 1
+    assert site.page_requests() == ["/page/1"]
+
+
+def test_requests_to_one_host_are_spaced(site, tmp_path):
+    delay = 0.05
+    crawl([site.url(f"/page/{n}") for n in range(6)], tmp_path, delay=delay, per_host=4)
+    starts = sorted(t for t, _ in site.requests)
+    gaps = [b - a for a, b in zip(starts, starts[1:])]
+    assert len(starts) == 7  # robots.txt and six pages
+    assert min(gaps) >= delay * 0.9
+
+
+def test_crawl_delay_from_robots_overrides_a_shorter_delay(site, tmp_path):
+    site.robots = "User-agent: *\nCrawl-delay: 0.2\n"
+    crawl([site.url(f"/page/{n}") for n in range(3)], tmp_path, delay=0.01)
+    starts = sorted(t for t, path in site.requests if path != "/robots.txt")
+    assert min(b - a for a, b in zip(starts, starts[1:])) >= 0.18
+
+
+def test_crawl_delay_parsing():
+    agent = "ProjectManasBot/1.0 (knowledge base ingestion)"
+    assert robots_crawl_delay("User-agent: *\nCrawl-delay: 0.2\n", agent) == 0.2
+    assert robots_crawl_delay("User-agent: *\nCrawl-delay: 1\n\nUser-agent: projectmanasbot\nCrawl-delay: 2.5\n",
+                              agent) == 2.5
+    assert robots_crawl_delay("User-agent: otherbot\nCrawl-delay: 9\n", agent) is None
+    assert robots_crawl_delay("User-agent: *\nCrawl-delay: soon\nDisallow: /x\n", agent) is None
+
+
+def test_unchanged_pages_are_served_from_the_cache(site, tmp_path):
+    urls = [site.url(f"/page/{n}") for n in range(4)]
+    first, crawler = crawl(urls, tmp_path)
+    assert crawler.stats["fetched"] == 4
+
+    again, crawler = crawl(urls, tmp_path)
+    assert again == first
+    assert crawler.stats["not_modified"] == 4
+    assert crawler.stats["fetched"] == 0
+
+    site.version += 1
+    changed, crawler = crawl(urls, tmp_path)
+    assert crawler.stats["fetched"] == 4
+    assert all("version 1" in text for text in changed.values())
+
+
+def test_server_errors_fall_back_to_the_cache(site, tmp_path):
+    urls = [site.url("/page/1")]
+    first, _ = crawl(urls, tmp_path)
+    site.status = 503
+    again, crawler = crawl(urls, tmp_path)
+    assert again == first
+    assert crawler.stats["stale"] == 1
+
+
+def test_unavailable_source_without_cache_fails_the_crawl(site, tmp_path):
+    site.status = 503
+    with pytest.raises(IncompleteCrawl):
+        crawl([site.url("/page/1")], tmp_path)
@@ -0,0 +1,48 @@
+import logging
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("faiss")
+for module in ("nltk", "requests", "httpx", "bs4", "transformers"):
+    pytest.importorskip(module)
+
+import build_knowledge_base as kb
+
+
+def vectors(n, d=16, seed=0):
+    rng = np.random.default_rng(seed)
+    data = rng.standard_normal((n, d)).astype("float32")
+    kb.faiss.normalize_L2(data)
+    return {i: v for i, v in enumerate(data)}
+
+
+def sync(store, path, spec):
+    index, spec = kb.sync_index(store, path, spec)
+    kb.write_index(index, spec, path)
+    return spec
+
+
+def test_small_ivf_pq_falls_back_to_flat_and_records_the_request():
+    _, spec = kb.make_index(16, 100, kb.index_spec("ivf_pq", pq_m=4))
+    assert spec["type"] == "flat"
+    assert spec["requested_type"] == "ivf_pq"
+
+
+def test_flat_stand_in_is_updated_in_place(tmp_path, caplog):
+    path = str(tmp_path / "kb.index")
+    spec = kb.index_spec("ivf_pq", pq_m=4, pq_bits=4)  # IVF-PQ needs 624 vectors
+    store = vectors(100)
+    assert sync(store, path, spec)["type"] == "flat"
+
+    store.update({i + 1000: v for i, v in vectors(10, seed=1).items()})
+    with caplog.at_level(logging.INFO):
+        assert sync(store, path, spec)["type"] == "flat"
+    assert "updated in place" in caplog.text
+
+
+def test_flat_stand_in_is_replaced_once_ivf_pq_can_be_trained(tmp_path):
+    path = str(tmp_path / "kb.index")
+    spec = kb.index_spec("ivf_pq", pq_m=4, pq_bits=4, nlist=4)
+    sync(vectors(100), path, spec)
+    assert sync(vectors(700), path, spec)["type"] == "ivf_pq"
@@ -0,0 +1,124 @@
+from inference_cache import InferenceCache, cache_key, normalize_text
+
+
+def counting(calls):
+    def fn(texts):
+        calls.append(list(texts))
+        return [{"label": t.strip().lower()} for t in texts]
+    return fn
+
+
+def test_normalize_text():
+    assert normalize_text("  I feel\tSO tired \n") == "i feel so tired"
+
+
+def test_texts_differing_in_case_and_spacing_share_an_entry():
+    cache = InferenceCache(max_entries=10, path="")
+    calls = []
+    first = cache.batch("emotion", "v1", counting(calls), ["I feel  Tired"])
+    again = cache.batch("emotion", "v1", counting(calls), ["i feel tired", " I FEEL TIRED "])
+    assert calls == [["I feel  Tired"]]
+    assert again == [first[0], first[0]]
+    assert cache.stats()["hits"] == 2
+
+
+def test_only_misses_reach_the_model_and_order_is_kept():
+    cache = InferenceCache(max_entries=10, path="")
+    calls = []
+    cache.batch("emotion", "v1", counting(calls), ["a", "b"])
+    results = cache.batch("emotion", "v1", counting(calls), ["c", "a", "d", "b"])
+    assert calls[1] == ["c", "d"]
+    assert [r["label"] for r in results] == ["c", "a", "d", "b"]
+
+
+def test_task_and_version_are_part_of_the_key():
+    cache = InferenceCache(max_entries=10, path="")
+    calls = []
+    cache.batch("emotion", "v1", counting(calls), ["x"])
+    cache.batch("emotion", "v2", counting(calls), ["x"])
+    cache.batch("sentiment", "v1", counting(calls), ["x"])
+    assert len(calls) == 3
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = InferenceCache(max_entries=2, path="")
+    calls = []
+    cache.batch("t", "v", counting(calls), ["a", "b"])
+    cache.batch("t", "v", counting(calls), ["a"])  # a is now more recent than b
+    cache.batch("t", "v", counting(calls), ["c"])
+    assert len(cache.entries) == 2
+    calls.clear()
+    cache.batch("t", "v", counting(calls), ["a", "b", "c"])
+    assert calls == [["b"]]
+
+
+def test_expired_entries_are_recomputed(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("inference_cache.time.time", lambda: now[0])
+    cache = InferenceCache(max_entries=10, ttl=60, path="")
+    calls = []
+    cache.batch("t", "v", counting(calls), ["a"])
+    now[0] += 59
+    cache.batch("t", "v", counting(calls), ["a"])
+    now[0] += 2
+    cache.batch("t", "v", counting(calls), ["a"])
+    assert calls == [["a"], ["a"]]
+
+
+def test_bypassed_texts_are_never_cached():
+    cache = InferenceCache(max_entries=10, path="")
+    calls = []
+    bypass = lambda t: "hurt" in t
+    cache.batch("t", "v", counting(calls), ["i want to hurt myself", "hi"], bypass=bypass)
+    cache.batch("t", "v", counting(calls), ["i want to hurt myself", "hi"], bypass=bypass)
+    assert calls == [["i want to hurt myself", "hi"], ["i want to hurt myself"]]
+    assert cache.stats()["bypassed"] == 2
+    assert len(cache.entries) == 1
+
+
+def test_zero_size_disables_the_cache():
+    cache = InferenceCache(max_entries=0, path="")
+    calls = []
+    cache.batch("t", "v", counting(calls), ["a"])
+    cache.batch("t", "v", counting(calls), ["a"])
+    assert len(calls) == 2
+    assert not cache.entries
+
+
+def test_saves_from_several_workers_are_merged(tmp_path):
+    path = str(tmp_path / "cache.json")
+    first = InferenceCache(max_entries=10, path=path, save_interval=0)
+    second = InferenceCache(max_entries=10, path=path, save_interval=0)
+    calls = []
+    first.batch("t", "v", counting(calls), ["a"])
+    second.batch("t", "v", counting(calls), ["b"])
+    first.save()
+    second.save()
+
+    fresh = InferenceCache(max_entries=10, path=path, save_interval=0)
+    calls.clear()
+    fresh.batch("t", "v", counting(calls), ["a", "b"])
+    assert calls == []
+    assert not [p for p in tmp_path.iterdir() if ".tmp" in p.name]
+
+
+def test_loaded_entries_do_not_evict_local_ones(tmp_path):
+    path = str(tmp_path / "cache.json")
+    other = InferenceCache(max_entries=10, path=path, save_interval=0)
+    other.batch("t", "v", counting([]), ["x", "y"])
+    other.save()
+
+    cache = InferenceCache(max_entries=2, path="", save_interval=0)
+    cache.path = path
+    cache.batch("t", "v", counting([]), ["a", "b"])
+    cache.save()
+    assert list(cache.entries) == [cache_key("t", "v", "a"), cache_key("t", "v", "b")]
+
+
+def test_saved_keys_do_not_contain_the_text(tmp_path):
+    path = tmp_path / "cache.json"
+    cache = InferenceCache(max_entries=10, path=str(path), save_interval=0)
+    cache.batch("t", "v", lambda texts: [{"label": "x"} for _ in texts], ["I Feel  hopeless"])
+    cache.save()
+    assert "hopeless" not in path.read_text()
+    assert list(cache.entries) == [cache_key("t", "v", "i feel hopeless")]
@@ -0,0 +1,46 @@
+import sys
+
+import pytest
+
+pytest.importorskip("transformers")
+
+import model_registry
+from model_registry import ModelRegistry
+
+
+@pytest.fixture
+def no_optimum(monkeypatch):
+    # A None entry in sys.modules makes the import raise ImportError.
+    for name in ("optimum", "optimum.onnxruntime", "optimum.onnxruntime.configuration", "onnxruntime"):
+        monkeypatch.setitem(sys.modules, name, None)
+
+
+def test_onnx_request_falls_back_to_torch(no_optimum, monkeypatch):
+    loaded = []
+
+    def fake_pipeline(task, model):
+        loaded.append((task, model))
+        return object()
+
+    monkeypatch.setattr(model_registry, "pipeline", fake_pipeline)
+    registry = ModelRegistry()
+
+    pipe = registry.get("text-classification", "some/model", "onnx")
+    assert registry.get("text-classification", "some/model", "onnx") is pipe
+    assert loaded == [("text-classification", "some/model")]
+
+    stats = registry.report()["loaded"][0]
+    assert stats["backend"] == "torch"
+    assert stats["requested_backend"] == "onnx"
+
+
+def test_onnx_errors_other_than_missing_packages_propagate(monkeypatch):
+    import onnx_backend
+
+    def broken(task, model):
+        raise RuntimeError("export failed")
+
+    monkeypatch.setattr(onnx_backend, "load_pipeline", broken)
+    monkeypatch.setattr(model_registry, "pipeline", lambda task, model: pytest.fail("fell back to torch"))
+    with pytest.raises(RuntimeError, match="export failed"):
+        ModelRegistry().get("text-classification", "some/model", "onnx")
@@ -0,0 +1,78 @@
+"""
+The safety cascade with both models replaced by stubs, so the keyword
+normalization and the escalation thresholds can be checked without
+loading anything.
+"""
+import pytest
+
+pytest.importorskip("transformers")
+pytest.importorskip("numpy")
+
+import Intent_Detection as intents
+from bench_safety import AT_RISK, SAFE
+
+
+def stub_models(monkeypatch, fast, heavy):
+    """
+    `fast` and `heavy` map a text to the self-harm probability the stubbed
+    model returns for it; the texts each model saw are recorded.
+    """
+    seen = {"safety_fast": [], "safety_zero_shot": []}
+    scores = {"safety_fast": fast, "safety_zero_shot": heavy}
+
+    def self_harm_scores(name, texts):
+        seen[name].extend(texts)
+        return [(scores[name](t), 0.8) for t in texts]
+
+    monkeypatch.setattr(intents, "self_harm_scores", self_harm_scores)
+    monkeypatch.setitem(intents.MODELS, "safety_fast", ("zero-shot-classification", "fast", "torch"))
+    monkeypatch.setattr(intents.result_cache, "max_entries", 0)
+    intents.safety_stages.clear()
+    return seen
+
+
+def test_normalize_for_safety():
+    assert intents.normalize_for_safety("I Can’t  go on...") == "i cant go on "
+    assert intents.simple_keyword_safety("I can't  go on anymore") == (True, "cant go on")
+    assert intents.simple_keyword_safety("I want to   die tonight") == (True, "want to die")
+    assert intents.simple_keyword_safety("this assignment is killing me lol") == (False, None)
+
+
+def test_keyword_hits_never_reach_the_models(monkeypatch):
+    seen = stub_models(monkeypatch, fast=lambda t: 0.0, heavy=lambda t: 0.0)
+    texts = [t for t in AT_RISK if intents.simple_keyword_safety(t)[0]]
+    results = intents.safety_check_batch(texts)
+    assert all(r["high_risk"] and r["reason"].startswith("keyword:") for r in results)
+    assert seen == {"safety_fast": [], "safety_zero_shot": []}
+
+
+@pytest.mark.parametrize("fast_risk, heavy_risk, reason, high_risk, escalated", [
+    (intents.SAFETY_FAST_HIGH, 0.0, "fast_selfharm", True, False),
+    (intents.SAFETY_FAST_LOW, 1.0, "none_detected", False, False),
+    (0.5, intents.SAFETY_HEAVY_THRESHOLD + 0.01, "zero_shot_selfharm", True, True),
+    (0.5, intents.SAFETY_HEAVY_THRESHOLD, "none_detected", False, True),
+])
+def test_escalation_thresholds(monkeypatch, fast_risk, heavy_risk, reason, high_risk, escalated):
+    seen = stub_models(monkeypatch, fast=lambda t: fast_risk, heavy=lambda t: heavy_risk)
+    result = intents.safety_check("I have not been feeling like myself")
+    assert (result["reason"], result["high_risk"]) == (reason, high_risk)
+    assert bool(seen["safety_zero_shot"]) == escalated
+
+
+def test_corpus_routes_through_the_cascade(monkeypatch):
+    # The fast model is unsure about the at-risk messages without keywords
+    # and about the one safe message that sounds violent; it clears the rest.
+    unsure = {t for t in AT_RISK if not intents.simple_keyword_safety(t)[0]}
+    unsure.add("this assignment is killing me lol")
+    seen = stub_models(
+        monkeypatch,
+        fast=lambda t: 0.5 if t in unsure else 0.05,
+        heavy=lambda t: 0.95 if t in AT_RISK else 0.3,
+    )
+    results = dict(zip(AT_RISK + SAFE, intents.safety_check_batch(AT_RISK + SAFE)))
+
+    assert all(results[t]["high_risk"] for t in AT_RISK)
+    assert not any(results[t]["high_risk"] for t in SAFE)
+    assert sorted(seen["safety_zero_shot"]) == sorted(unsure)
+    assert intents.safety_stages["heavy"] == len(unsure)
+    assert intents.safety_stages["keyword"] + len(unsure) - 1 == len(AT_RISK)